@@ -0,0 +1,96 @@
+import json
+import re
+from typing import Any, Iterator, Optional, Tuple
+
+from app import json_utils
+
+
+_JSON_CHUNK_TYPES = frozenset({"output_json", "json"})
+
+
+def _field(obj: Any, name: str) -> Any:
+    # Output items are SDK objects, or plain dicts when the response was rebuilt from JSON.
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _output_chunks(response) -> Iterator[Tuple[Any, Any]]:
+    for item in getattr(response, "output", None) or []:
+        for chunk in _field(item, "content") or []:
+            yield _field(chunk, "type"), chunk
+
+
+def extract_output_text(response) -> Optional[str]:
+    # The SDK aggregates text into output_text; walking the items is only a fallback.
+    output_text = getattr(response, "output_text", None)
+    if output_text:
+        return output_text
+    for chunk_type, chunk in _output_chunks(response):
+        if chunk_type == "output_text":
+            candidate = _field(chunk, "text")
+            if candidate:
+                return candidate
+    return None
+
+
+def _extract_output(response) -> Tuple[Optional[str], Optional[Any]]:
+    # One walk over the output items yields both the structured payload and the text fallback.
+    parsed = getattr(response, "output_parsed", None)
+    if isinstance(parsed, (dict, list)):
+        return None, parsed
+    first_text = None
+    for chunk_type, chunk in _output_chunks(response):
+        if chunk_type in _JSON_CHUNK_TYPES:
+            candidate = _field(chunk, "json")
+            if isinstance(candidate, (dict, list)):
+                return None, candidate
+        elif chunk_type == "output_text" and first_text is None:
+            first_text = _field(chunk, "text") or None
+    return getattr(response, "output_text", None) or first_text, None
+
+
+_CODE_FENCE_PREFIX_RE = re.compile(r"^```(?:json)?\s*")
+
+
+def strip_code_fence(value: str) -> str:
+    # Some models occasionally wrap JSON in fenced code blocks.
+    if not value.startswith("```"):
+        return value
+    first_line, newline, rest = value.partition("\n")
+    if newline and first_line[3:].strip().lower() in ("", "json"):
+        body = rest
+    else:
+        body = _CODE_FENCE_PREFIX_RE.sub("", value, count=1)
+    return body.removesuffix("```").rstrip()
+
+
+def parse_response_json_any(response) -> Optional[Any]:
+    output_text, data = _extract_output(response)
+    if data is not None:
+        return data
+
+    if not output_text:
+        return None
+    cleaned = strip_code_fence(output_text.strip())
+    try:
+        return json_utils.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+
+    for start_char, end_char in (("{", "}"), ("[", "]")):
+        start_idx = cleaned.find(start_char)
+        end_idx = cleaned.rfind(end_char)
+        if start_idx == -1 or end_idx == -1 or end_idx <= start_idx:
+            continue
+        candidate = cleaned[start_idx : end_idx + 1]
+        try:
+            return json_utils.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def parse_response_json(response) -> Optional[dict]:
+    parsed = parse_response_json_any(response)
+    return parsed if isinstance(parsed, dict) else None
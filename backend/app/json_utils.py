@@ -0,0 +1,15 @@
+from typing import Any, Union
+
+import orjson
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing handlers keep working.
+JSONDecodeError = orjson.JSONDecodeError
+
+
+def dumps(value: Any, sort_keys: bool = False) -> str:
+    # orjson always emits UTF-8 without ASCII escaping, matching ensure_ascii=False.
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else None).decode("utf-8")
+
+
+def loads(raw: Union[str, bytes]) -> Any:
+    return orjson.loads(raw)
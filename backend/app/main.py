@@ -1,18 +1,27 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, RedirectResponse, Response
+import copy
 import json
 import os
 import re
 import asyncio
 import ipaddress
 import socket
+import threading
+import time
 import hashlib
+import gzip
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, Optional, List, Tuple, Literal, Mapping
+from types import MappingProxyType
+from typing import Dict, Any, Awaitable, Callable, Iterable, Optional, List, Tuple, Literal, Mapping, Union
 from datetime import date, datetime, timedelta
 from urllib.parse import urlsplit, urljoin
 
 import httpx
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection, Row
 from sqlmodel import create_engine, Session, SQLModel, text as sql_text, select
 
 from app.domain_utils import (
@@ -22,6 +31,8 @@ from app.domain_utils import (
     days_until_birthday,
     expense_party_label,
 )
+from app import json_utils
+from app.ai_utils import extract_output_text, parse_response_json, parse_response_json_any
 from app.finance_utils import (
     FINANCE_CATEGORIES,
     FINANCE_CATEGORY_LABELS,
@@ -89,15 +100,62 @@ from app.services.shop_output import (
 )
 
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from pydantic import BaseModel
 from uuid import UUID
 
+# Route return values are run through jsonable_encoder first, so orjson only
+# sees plain JSON types; it renders them several times faster than stdlib json.
 app = FastAPI(
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs",
     openapi_url="/api/openapi.json",
     redoc_url=None,
 )
 
+class JSONGZipMiddleware:
+    """GZip only JSON responses; photos and other binary bodies are already compressed."""
+
+    def __init__(self, app: Any, minimum_size: int = 1000, compresslevel: int = 5) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        held_start: Optional[Dict[str, Any]] = None
+
+        async def send_maybe_compressed(message: Dict[str, Any]) -> None:
+            nonlocal held_start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if headers.get("content-type", "").startswith("application/json") and "content-encoding" not in headers:
+                    # Hold the start message until the body size is known.
+                    held_start = message
+                    return
+            elif message["type"] == "http.response.body" and held_start is not None:
+                start, held_start = held_start, None
+                body = message.get("body", b"")
+                if not message.get("more_body", False) and len(body) >= self.minimum_size:
+                    body = gzip.compress(body, compresslevel=self.compresslevel)
+                    headers = MutableHeaders(raw=start["headers"])
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    message = {**message, "body": body}
+                await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_maybe_compressed)
+
+
+# Compress larger JSON responses (recipe lists, shop payloads). Registered before
+# CORS so CORS stays the outermost middleware.
+app.add_middleware(JSONGZipMiddleware, minimum_size=1000, compresslevel=5)
+
 # CORS (Frontend -> Backend)
 allowed = os.getenv("CORS_ORIGINS", "*")
 origins = [o.strip() for o in allowed.split(",") if o.strip()]
@@ -114,7 +172,20 @@ app.add_middleware(
 # Database setup
 # -----------------------------
 DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
-engine = create_engine(DATABASE_URL, pool_pre_ping=True) if DATABASE_URL else None
+DB_POOL_SIZE = 5
+DB_POOL_MAX_OVERFLOW = 10
+# Fail a request after this long instead of queueing forever on an exhausted pool.
+DB_POOL_TIMEOUT_SECONDS = 10
+DB_POOL_WARM_CONNECTIONS = 2
+# LIFO keeps the few hot connections warm instead of cycling through the whole pool.
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_use_lifo=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+) if DATABASE_URL else None
 
 AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0").strip() == "1"
 if engine and AUTO_MIGRATE:
@@ -217,36 +288,39 @@ DAY_ALIASES = {
     "so": 7, "sonntag": 7,
 }
 
-DEFAULT_PANTRY_ITEMS = [
-    {"name": "Salz", "uncertain": False, "aliases": []},
-    {"name": "Pfeffer", "uncertain": False, "aliases": []},
-    {"name": "Zucker", "uncertain": False, "aliases": []},
-    {"name": "Mehl", "uncertain": False, "aliases": []},
-    {"name": "Olivenöl", "uncertain": False, "aliases": ["Speiseöl", "Kochöl"]},
-    {"name": "Essig", "uncertain": False, "aliases": []},
-    {"name": "Sojasauce", "uncertain": False, "aliases": []},
-    {"name": "Senf", "uncertain": False, "aliases": []},
-    {"name": "Tomatenmark", "uncertain": False, "aliases": []},
-    {"name": "Brühe", "uncertain": False, "aliases": ["Bouillon"]},
-    {"name": "Reis", "uncertain": False, "aliases": []},
-    {"name": "Pasta", "uncertain": False, "aliases": ["Nudeln"]},
-    {"name": "Paprikapulver", "uncertain": False, "aliases": []},
-    {"name": "Curry", "uncertain": False, "aliases": []},
-    {"name": "Chili", "uncertain": False, "aliases": []},
-    {"name": "Oregano", "uncertain": False, "aliases": []},
-    {"name": "Basilikum", "uncertain": False, "aliases": []},
-    {"name": "Backpulver", "uncertain": False, "aliases": []},
-    {"name": "Stärke", "uncertain": False, "aliases": ["Speisestärke"]},
-    {"name": "Knoblauch", "uncertain": True, "aliases": []},
-    {"name": "Zwiebeln", "uncertain": True, "aliases": []},
-]
+DEFAULT_PANTRY_ITEMS: Tuple[Mapping[str, Any], ...] = tuple(
+    MappingProxyType({"name": name, "uncertain": uncertain, "aliases": aliases})
+    for name, uncertain, aliases in (
+        ("Salz", False, ()),
+        ("Pfeffer", False, ()),
+        ("Zucker", False, ()),
+        ("Mehl", False, ()),
+        ("Olivenöl", False, ("Speiseöl", "Kochöl")),
+        ("Essig", False, ()),
+        ("Sojasauce", False, ()),
+        ("Senf", False, ()),
+        ("Tomatenmark", False, ()),
+        ("Brühe", False, ("Bouillon",)),
+        ("Reis", False, ()),
+        ("Pasta", False, ("Nudeln",)),
+        ("Paprikapulver", False, ()),
+        ("Curry", False, ()),
+        ("Chili", False, ()),
+        ("Oregano", False, ()),
+        ("Basilikum", False, ()),
+        ("Backpulver", False, ()),
+        ("Stärke", False, ("Speisestärke",)),
+        ("Knoblauch", True, ()),
+        ("Zwiebeln", True, ()),
+    )
+)
 
 
 def _pantry_key(value: str) -> str:
     return re.sub(r"\s+", " ", str(value or "").strip().lower())
 
 
-def _normalize_pantry_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _normalize_pantry_items(items: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
     merged: Dict[str, Dict[str, Any]] = {}
     order: List[str] = []
     for raw in items:
@@ -277,8 +351,8 @@ def _normalize_pantry_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]
             seen_aliases.add(alias_key)
 
     return [merged[key] for key in order]
-DEFAULT_PREFERENCES = {"tags": []}
-DEFAULT_TELEGRAM = {
+DEFAULT_PREFERENCES = MappingProxyType({"tags": ()})
+DEFAULT_TELEGRAM = MappingProxyType({
     "auto_send_plan": False,
     "auto_send_shop": False,
     "notify_new_recipe": False,
@@ -290,20 +364,20 @@ DEFAULT_TELEGRAM = {
     "notify_new_pinboard_note": False,
     "notify_new_birthday": False,
     "notify_new_family_member": False,
-}
-DEFAULT_SHOP_SETTINGS = {
+})
+DEFAULT_SHOP_SETTINGS = MappingProxyType({
     "shop_output_mode": SHOP_OUTPUT_AI,
     "shopping_list_view_mode": "checklist",
     "shopping_list_include_weekly_by_default": True,
     "shopping_list_open_after_create": True,
     "shopping_list_estimate_currency": "chf",
-}
-DEFAULT_ACTIVITIES_SETTINGS = {
+})
+DEFAULT_ACTIVITIES_SETTINGS = MappingProxyType({
     "default_location": "",
     "max_travel_min": 30,
     "budget": "egal",
     "transport": "egal",
-    "types": [],
+    "types": (),
     "use_weather": True,
     "prefer_mountains": False,
     "home_duration_min": 30,
@@ -311,23 +385,29 @@ DEFAULT_ACTIVITIES_SETTINGS = {
     "home_mess_level": "egal",
     "home_space": "wohnzimmer",
     "home_parent_energy": "mittel",
-    "home_materials": ["Bücher", "Bausteine", "Kissen", "Klebeband", "Papier"],
-    "home_types": ["Bewegung", "Rollenspiel", "Bauen"],
-}
-DEFAULT_BIRTHDAY_SETTINGS = {
+    "home_materials": ("Bücher", "Bausteine", "Kissen", "Klebeband", "Papier"),
+    "home_types": ("Bewegung", "Rollenspiel", "Bauen"),
+})
+DEFAULT_BIRTHDAY_SETTINGS = MappingProxyType({
     "birthday_default_relation": "Familie",
     "birthday_upcoming_window_days": 7,
     "gift_default_occasion": "Geburtstag",
     "gift_budget_range": "25-50 CHF",
-    "gift_preferred_types": ["Erlebnis", "Kreativ", "Spielzeug"],
-    "gift_no_goes": ["zu laut", "zu groß"],
-}
+    "gift_preferred_types": ("Erlebnis", "Kreativ", "Spielzeug"),
+    "gift_no_goes": ("zu laut", "zu groß"),
+})
+
+
+def _fresh_settings_defaults(defaults: Mapping[str, Any]) -> Dict[str, Any]:
+    # List defaults are stored as tuples so module state stays immutable; callers get their own lists.
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in defaults.items()}
 
-ACTIVITIES_MAX_TRAVEL_OPTIONS = [15, 30, 45, 60, 90, 120]
-ACTIVITIES_TIME_BUCKETS = ["1–2 Stunden", "2–4 Stunden", "Halber Tag", "Ganzer Tag"]
+
+ACTIVITIES_MAX_TRAVEL_OPTIONS = frozenset({15, 30, 45, 60, 90, 120})
+ACTIVITIES_TIME_BUCKETS = frozenset({"1–2 Stunden", "2–4 Stunden", "Halber Tag", "Ganzer Tag"})
 ACTIVITIES_BUDGET_OPTIONS = {"niedrig", "mittel", "egal"}
 ACTIVITIES_TRANSPORT_OPTIONS = {"auto", "oev", "zu_fuss", "egal"}
-HOME_ACTIVITY_DURATION_OPTIONS = [15, 20, 30, 45, 60, 90]
+HOME_ACTIVITY_DURATION_OPTIONS = frozenset({15, 20, 30, 45, 60, 90})
 HOME_ACTIVITY_ENERGY_OPTIONS = {"ruhig", "mittel", "wild"}
 HOME_ACTIVITY_MESS_OPTIONS = {"sauber", "egal", "chaos_ok"}
 HOME_ACTIVITY_SPACE_OPTIONS = {"wohnzimmer", "kinderzimmer", "klein", "egal"}
@@ -343,6 +423,7 @@ APP_STATE_TELEGRAM_LAST_CHAT_ID = "telegram_last_chat_id"
 APP_STATE_PINBOARD_CATEGORIES = "pinboard_categories"
 APP_STATE_CHORE_SETTINGS = "chore_settings"
 APP_STATE_TG_STATE_PREFIX = "tg_state:"
+APP_STATE_SCHEDULER_LAST_RUN = "scheduler_last_run"
 
 DEFAULT_PINBOARD_CATEGORIES = [
     {"id": "allgemein", "label": "Allgemein", "color": "#6b7280"},
@@ -360,6 +441,16 @@ IMPORT_PROMPT_MAX_CHARS = 8000
 IMPORT_PREVIEW_CACHE_TTL_SECONDS = 20 * 60
 IMPORT_PREVIEW_CACHE_PREFIX = "import_preview_cache:"
 
+TELEGRAM_API_BASE_URL = "https://api.telegram.org"
+TELEGRAM_DEBUG = os.getenv("TELEGRAM_DEBUG", "0").strip() == "1"
+# Parsed once at import; empty means every sender is allowed.
+TELEGRAM_ALLOWLIST = frozenset(
+    x.strip() for x in os.getenv("TELEGRAM_ALLOWLIST", "").split(",") if x.strip()
+)
+# Shared Telegram client, opened on startup together with the loop it belongs to.
+_tg_client: Optional[httpx.AsyncClient] = None
+_tg_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
 
 #-----------------------------
 # Start Up
@@ -367,9 +458,47 @@ IMPORT_PREVIEW_CACHE_PREFIX = "import_preview_cache:"
 @app.on_event("startup")
 def _on_startup():
     try:
+        _init_app_state_table()
         _db_set_scheduler_heartbeat()
     except Exception:
         pass
+    _warm_db_pool()
+
+
+def _warm_db_pool() -> None:
+    """Open a few pooled connections up front so the first webhook burst skips the handshakes."""
+    if engine is None:
+        return
+    conns = []
+    try:
+        for _ in range(DB_POOL_WARM_CONNECTIONS):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.execute(sql_text("select 1"))
+    except Exception:
+        pass
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+@app.on_event("startup")
+async def _open_tg_client():
+    global _tg_client, _tg_client_loop
+    _tg_client = httpx.AsyncClient(
+        base_url=TELEGRAM_API_BASE_URL,
+        timeout=20,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+    )
+    _tg_client_loop = asyncio.get_running_loop()
+
+
+@app.on_event("shutdown")
+async def _close_tg_client():
+    global _tg_client, _tg_client_loop
+    client, _tg_client, _tg_client_loop = _tg_client, None, None
+    if client is not None:
+        await client.aclose()
 
 # -----------------------------
 # Health endpoints
@@ -427,63 +556,64 @@ def jobs_status():
     if engine is None:
         return {"ok": False, "error": "DATABASE_URL missing"}
 
-    from datetime import datetime, timezone, timedelta
-    from sqlalchemy import text
-
-    with engine.connect() as conn:
-        conn.execute(
-            text(
-                """
-                create table if not exists public.app_state (
-                  key text primary key,
-                  value text not null,
-                  updated_at timestamptz not null default now()
-                )
-                """
-            )
-        )
-        conn.commit()
-
-        row = conn.execute(
-            text("select value, updated_at from public.app_state where key='scheduler_last_run'")
-        ).fetchone()
+    from datetime import timezone
 
-    if not row:
+    value, updated_at = _db_get_app_state_row(APP_STATE_SCHEDULER_LAST_RUN)
+    if value is None:
         return {"ok": False, "last_run": None, "hint": "No scheduler heartbeat yet"}
 
-    value, updated_at = row[0], row[1]
-
     # updated_at comes as datetime
     now = datetime.now(timezone.utc)
     ok = (updated_at is not None) and (updated_at >= (now - timedelta(days=8)))
     return {"ok": bool(ok), "last_run": value, "updated_at": updated_at.isoformat()}
 
 
-def _ensure_app_state_table(conn) -> None:
-    conn.execute(
-        sql_text(
-            """
-            create table if not exists public.app_state (
-              key text primary key,
-              value text not null,
-              updated_at timestamptz not null default now()
-            )
-            """
-        )
+_SQL_CREATE_APP_STATE = sql_text(
+    """
+    create table if not exists public.app_state (
+      key text primary key,
+      value text not null,
+      updated_at timestamptz not null default now()
     )
-    conn.commit()
+    """
+)
+_SQL_GET_APP_STATE_VALUE = sql_text("select value from public.app_state where key = :k")
+_SQL_GET_APP_STATE_ROW = sql_text("select value, updated_at from public.app_state where key = :k")
+_SQL_UPSERT_APP_STATE = sql_text(
+    """
+    insert into public.app_state (key, value)
+    values (:k, :v)
+    on conflict (key) do update set value = excluded.value, updated_at = now()
+    """
+)
+
 
+# Set once startup has committed the CREATE TABLE; later calls skip the DDL round-trip.
+_app_state_table_ready = False
 
-def _db_get_app_state_value(key: str) -> Optional[str]:
+
+def _ensure_app_state_table(conn) -> None:
+    if _app_state_table_ready:
+        return
+    conn.execute(_SQL_CREATE_APP_STATE)
+
+
+def _init_app_state_table() -> None:
+    global _app_state_table_ready
+    with engine.begin() as conn:
+        conn.execute(_SQL_CREATE_APP_STATE)
+    _app_state_table_ready = True
+
+
+def _db_get_app_state_value(key: str, conn: Optional[Connection] = None) -> Optional[str]:
     if engine is None:
         raise RuntimeError("DATABASE_URL missing")
-    with engine.connect() as conn:
-        _ensure_app_state_table(conn)
-        row = conn.execute(
-            sql_text("select value from public.app_state where key = :k"),
-            {"k": key},
-        ).fetchone()
-        return row[0] if row else None
+    if conn is None:
+        with engine.connect() as conn:
+            return _db_get_app_state_value(key, conn)
+    _ensure_app_state_table(conn)
+    row = conn.execute(_SQL_GET_APP_STATE_VALUE, {"k": key}).fetchone()
+    return row[0] if row else None
 
 
 def _db_get_app_state_row(key: str) -> Tuple[Optional[str], Optional[datetime]]:
@@ -491,39 +621,30 @@ def _db_get_app_state_row(key: str) -> Tuple[Optional[str], Optional[datetime]]:
         raise RuntimeError("DATABASE_URL missing")
     with engine.connect() as conn:
         _ensure_app_state_table(conn)
-        row = conn.execute(
-            sql_text("select value, updated_at from public.app_state where key = :k"),
-            {"k": key},
-        ).fetchone()
+        row = conn.execute(_SQL_GET_APP_STATE_ROW, {"k": key}).fetchone()
         if not row:
             return None, None
         return row[0], row[1]
 
 
-def _db_set_app_state_value(key: str, value: str) -> None:
+def _db_set_app_state_value(key: str, value: str, conn: Optional[Connection] = None) -> None:
+    """Upsert one app_state key; with a caller-supplied conn the caller commits."""
     if engine is None:
         raise RuntimeError("DATABASE_URL missing")
-    with engine.connect() as conn:
-        _ensure_app_state_table(conn)
-        conn.execute(
-            sql_text(
-                """
-                insert into public.app_state (key, value)
-                values (:k, :v)
-                on conflict (key) do update set value = excluded.value, updated_at = now()
-                """
-            ),
-            {"k": key, "v": value},
-        )
-        conn.commit()
+    if conn is None:
+        with engine.begin() as conn:
+            _db_set_app_state_value(key, value, conn)
+        return
+    _ensure_app_state_table(conn)
+    conn.execute(_SQL_UPSERT_APP_STATE, {"k": key, "v": value})
 
 
-def _db_get_app_state_json(key: str, default: Any) -> Any:
-    raw = _db_get_app_state_value(key)
+def _db_get_app_state_json(key: str, default: Any, conn: Optional[Connection] = None) -> Any:
+    raw = _db_get_app_state_value(key, conn)
     if not raw:
         return default
     try:
-        return json.loads(raw)
+        return json_utils.loads(raw)
     except Exception:
         return default
 
@@ -552,11 +673,11 @@ def _get_swap_avoid_list(week_start: date) -> List[str]:
 
 def _set_swap_avoid_list(week_start: date, avoid_list: List[str]) -> None:
     unique = sorted({rid for rid in avoid_list if rid})
-    _db_set_app_state_value(_swap_avoid_key(week_start), json.dumps(unique))
+    _db_set_app_state_value(_swap_avoid_key(week_start), json_utils.dumps(unique))
 
 
-def _clear_swap_avoid_list(week_start: date) -> None:
-    _db_set_app_state_value(_swap_avoid_key(week_start), json.dumps([]))
+def _clear_swap_avoid_list(week_start: date, conn: Optional[Connection] = None) -> None:
+    _db_set_app_state_value(_swap_avoid_key(week_start), json_utils.dumps([]), conn)
 
 
 
@@ -904,7 +1025,7 @@ def _get_import_preview_cache(canonical_url: str) -> Optional[Dict[str, Any]]:
     if updated_at < (now - timedelta(seconds=IMPORT_PREVIEW_CACHE_TTL_SECONDS)):
         return None
     try:
-        cached = json.loads(value)
+        cached = json_utils.loads(value)
     except Exception:
         return None
     if not isinstance(cached, dict):
@@ -917,7 +1038,7 @@ def _get_import_preview_cache(canonical_url: str) -> Optional[Dict[str, Any]]:
 def _set_import_preview_cache(canonical_url: str, payload: Dict[str, Any]) -> None:
     key_hash = hashlib.sha256(canonical_url.encode("utf-8")).hexdigest()
     key = f"{IMPORT_PREVIEW_CACHE_PREFIX}{key_hash}"
-    _db_set_app_state_value(key, json.dumps(payload))
+    _db_set_app_state_value(key, json_utils.dumps(payload))
 
 
 def _openai_probe(model: str) -> None:
@@ -1004,7 +1125,7 @@ def _openai_extract_recipe_draft(
             {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
             {
                 "role": "user",
-                "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}],
+                "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}],
             },
         ],
         text={"format": schema},
@@ -1012,36 +1133,14 @@ def _openai_extract_recipe_draft(
         truncation="auto",
     )
 
-    output_text = getattr(response, "output_text", None)
-    if not output_text:
-        output = getattr(response, "output", None) or []
-        for item in output:
-            content = getattr(item, "content", None)
-            if content is None and isinstance(item, dict):
-                content = item.get("content")
-            if not content:
-                continue
-            for chunk in content:
-                chunk_type = getattr(chunk, "type", None)
-                if chunk_type is None and isinstance(chunk, dict):
-                    chunk_type = chunk.get("type")
-                if chunk_type != "output_text":
-                    continue
-                candidate = getattr(chunk, "text", None)
-                if candidate is None and isinstance(chunk, dict):
-                    candidate = chunk.get("text")
-                if candidate:
-                    output_text = candidate
-                    break
-            if output_text:
-                break
+    output_text = extract_output_text(response)
     if not output_text:
         raise ValueError(
             "AI-Antwort ungültig. Falls das Modell keine Ausgabe liefert, OPENAI_MODEL z.B. auf gpt-4o-mini setzen."
         )
 
     try:
-        data = json.loads(output_text)
+        data = json_utils.loads(output_text)
     except Exception:
         raise ValueError("AI-Antwort ungültig.")
 
@@ -1165,14 +1264,14 @@ def _openai_generate_activities(
         tools=[{"type": "web_search"}],
         input=[
             {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+            {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
         ],
         text={"format": schema},
         max_output_tokens=900,
         truncation="auto",
     )
 
-    data = _parse_response_json_any(response)
+    data = parse_response_json_any(response)
     alternatives = _validate_activity_alternatives(data)
     if not alternatives:
         raise ValueError("AI-Antwort ungültig.")
@@ -1361,14 +1460,14 @@ def _openai_generate_home_activities(
         model=model,
         input=[
             {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+            {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
         ],
         text={"format": schema},
         max_output_tokens=2200,
         truncation="auto",
     )
 
-    data = _parse_response_json_any(response)
+    data = parse_response_json_any(response)
     cleaned = _coerce_home_alternatives(data)
     if cleaned:
         return cleaned
@@ -1378,7 +1477,7 @@ def _openai_generate_home_activities(
         json.dumps(
             {
                 "parsed_type": type(data).__name__ if data is not None else None,
-                "output_text": (_extract_output_text(response) or "")[:2000],
+                "output_text": (extract_output_text(response) or "")[:2000],
             },
             ensure_ascii=False,
         ),
@@ -1399,13 +1498,13 @@ def _openai_generate_home_activities(
                     ),
                 }],
             },
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+            {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
         ],
         max_output_tokens=2200,
         truncation="auto",
     )
 
-    fallback_data = _parse_response_json_any(fallback_response)
+    fallback_data = parse_response_json_any(fallback_response)
     cleaned = _coerce_home_alternatives(fallback_data)
     if cleaned:
         return cleaned
@@ -1415,7 +1514,7 @@ def _openai_generate_home_activities(
         json.dumps(
             {
                 "parsed_type": type(fallback_data).__name__ if fallback_data is not None else None,
-                "output_text": (_extract_output_text(fallback_response) or "")[:2000],
+                "output_text": (extract_output_text(fallback_response) or "")[:2000],
             },
             ensure_ascii=False,
         ),
@@ -1476,14 +1575,14 @@ def _openai_estimate_shopping_list_total(lines: List[str], currency: str = "chf"
         tools=[{"type": "web_search"}],
         input=[
             {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+            {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
         ],
         text={"format": schema},
         max_output_tokens=400,
         truncation="auto",
     )
 
-    data = _parse_response_json(response)
+    data = parse_response_json(response)
     if not isinstance(data, dict):
         raise ValueError("AI-Antwort ungültig.")
 
@@ -1629,14 +1728,14 @@ def _openai_generate_gift_ideas(
         model=model,
         input=[
             {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+            {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
         ],
         text={"format": schema},
         max_output_tokens=900,
         truncation="auto",
     )
 
-    data = _parse_response_json_any(response)
+    data = parse_response_json_any(response)
     cleaned = _coerce_gift_ideas(data)
     if len(cleaned) == 3:
         return cleaned
@@ -1654,12 +1753,12 @@ def _openai_generate_gift_ideas(
                     ),
                 }],
             },
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+            {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
         ],
         max_output_tokens=900,
         truncation="auto",
     )
-    cleaned = _coerce_gift_ideas(_parse_response_json_any(fallback_response))
+    cleaned = _coerce_gift_ideas(parse_response_json_any(fallback_response))
     if len(cleaned) < 3:
         raise ValueError("AI-Antwort ungültig.")
     return cleaned
@@ -1732,14 +1831,14 @@ def _openai_categorize_shopping_recipe_items(items: List[Dict[str, Any]]) -> Dic
             model=model,
             input=[
                 {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
-                {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+                {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
             ],
             text={"format": schema},
             max_output_tokens=1600,
             truncation="auto",
         )
 
-        data = _parse_response_json_any(response)
+        data = parse_response_json_any(response)
         if not isinstance(data, dict) or not isinstance(data.get("items"), list):
             raise ValueError("AI-Antwort ungültig.")
         return data["items"]
@@ -1832,7 +1931,7 @@ def _openai_suggest_pantry_aliases(
             model=model,
             input=[
                 {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
-                {"role": "user", "content": [{"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}]},
+                {"role": "user", "content": [{"type": "input_text", "text": json_utils.dumps(user_payload)}]},
             ],
             text={"format": schema},
             max_output_tokens=1800,
@@ -1841,7 +1940,7 @@ def _openai_suggest_pantry_aliases(
     except Exception:
         return {}
 
-    data = _parse_response_json_any(response)
+    data = parse_response_json_any(response)
     if not isinstance(data, dict):
         return {}
 
@@ -1864,92 +1963,6 @@ def _openai_suggest_pantry_aliases(
     return result
 
 
-def _extract_output_text(response) -> Optional[str]:
-    output_text = getattr(response, "output_text", None)
-    if output_text:
-        return output_text
-    output = getattr(response, "output", None) or []
-    for item in output:
-        content = getattr(item, "content", None)
-        if content is None and isinstance(item, dict):
-            content = item.get("content")
-        if not content:
-            continue
-        for chunk in content:
-            chunk_type = getattr(chunk, "type", None)
-            if chunk_type is None and isinstance(chunk, dict):
-                chunk_type = chunk.get("type")
-            if chunk_type != "output_text":
-                continue
-            candidate = getattr(chunk, "text", None)
-            if candidate is None and isinstance(chunk, dict):
-                candidate = chunk.get("text")
-            if candidate:
-                return candidate
-    return None
-
-
-def _extract_output_json(response) -> Optional[Any]:
-    parsed = getattr(response, "output_parsed", None)
-    if isinstance(parsed, (dict, list)):
-        return parsed
-
-    output = getattr(response, "output", None) or []
-    for item in output:
-        content = getattr(item, "content", None)
-        if content is None and isinstance(item, dict):
-            content = item.get("content")
-        if not content:
-            continue
-        for chunk in content:
-            chunk_type = getattr(chunk, "type", None)
-            if chunk_type is None and isinstance(chunk, dict):
-                chunk_type = chunk.get("type")
-            if chunk_type not in {"output_json", "json"}:
-                continue
-            candidate = getattr(chunk, "json", None)
-            if candidate is None and isinstance(chunk, dict):
-                candidate = chunk.get("json")
-            if isinstance(candidate, (dict, list)):
-                return candidate
-    return None
-
-
-def _parse_response_json_any(response) -> Optional[Any]:
-    data = _extract_output_json(response)
-    if isinstance(data, (dict, list)):
-        return data
-
-    output_text = _extract_output_text(response)
-    if not output_text:
-        return None
-    cleaned = output_text.strip()
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
-    try:
-        return json.loads(cleaned)
-    except Exception:
-        pass
-
-    for start_char, end_char in (("{", "}"), ("[", "]")):
-        start_idx = cleaned.find(start_char)
-        end_idx = cleaned.rfind(end_char)
-        if start_idx == -1 or end_idx == -1 or end_idx <= start_idx:
-            continue
-        candidate = cleaned[start_idx : end_idx + 1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            continue
-    return None
-
-
-def _parse_response_json(response) -> Optional[dict]:
-    parsed = _parse_response_json_any(response)
-    return parsed if isinstance(parsed, dict) else None
-
-
 def _leni_age_text(today: date) -> str:
     birth = date(2024, 10, 1)
     months = (today.year - birth.year) * 12 + (today.month - birth.month)
@@ -2025,17 +2038,19 @@ def _validate_activity_alternatives(data: Any) -> Optional[List[Dict[str, Any]]]
 def _validate_pantry_items(items: List["PantryItemPayload"]) -> List[Dict[str, Any]]:
     cleaned: List[Dict[str, Any]] = []
     for item in items:
-        name = (item.name or "").strip()
+        name = item.name.strip() if item.name else ""
         if not name:
             raise HTTPException(400, "pantry item name must be non-empty")
-        aliases = [a.strip() for a in (item.aliases or []) if a and a.strip()]
         # preserve order while removing duplicates
         seen = set()
         deduped_aliases = []
-        for a in aliases:
-            if a not in seen:
-                seen.add(a)
-                deduped_aliases.append(a)
+        for a in item.aliases or []:
+            if not a:
+                continue
+            alias = a.strip()
+            if alias and alias not in seen:
+                seen.add(alias)
+                deduped_aliases.append(alias)
         cleaned.append(
             {
                 "name": name,
@@ -2057,11 +2072,11 @@ def _clean_tags(tags: List[str]) -> List[str]:
     return unique
 
 
-def _get_settings_pantry() -> List[Dict[str, Any]]:
-    data = _db_get_app_state_json(APP_STATE_SETTINGS_PANTRY, {"items": DEFAULT_PANTRY_ITEMS})
+def _get_settings_pantry(conn: Optional[Connection] = None) -> List[Dict[str, Any]]:
+    data = _db_get_app_state_json(APP_STATE_SETTINGS_PANTRY, {"items": DEFAULT_PANTRY_ITEMS}, conn)
     items = data.get("items") if isinstance(data, dict) else None
     if not isinstance(items, list):
-        return _normalize_pantry_items(list(DEFAULT_PANTRY_ITEMS))
+        return _normalize_pantry_items(DEFAULT_PANTRY_ITEMS)
     normalized = []
     for raw in items:
         if not isinstance(raw, dict):
@@ -2080,17 +2095,27 @@ def _get_settings_pantry() -> List[Dict[str, Any]]:
                 "aliases": aliases,
             }
         )
-    return _normalize_pantry_items(normalized or list(DEFAULT_PANTRY_ITEMS))
+    return _normalize_pantry_items(normalized or DEFAULT_PANTRY_ITEMS)
+
+
+PREFERENCES_CACHE_TTL_SECONDS = 30.0
+_preferences_cache: Optional[Tuple[float, List[str]]] = None
 
 
 def _get_settings_preferences() -> Dict[str, Any]:
+    global _preferences_cache
+    now = time.monotonic()
+    cached = _preferences_cache
+    if cached is not None and now - cached[0] < PREFERENCES_CACHE_TTL_SECONDS:
+        return {"tags": list(cached[1])}
     data = _db_get_app_state_json(APP_STATE_SETTINGS_PREFERENCES, DEFAULT_PREFERENCES)
-    tags = data.get("tags") if isinstance(data, dict) else None
-    return {"tags": _clean_tags(tags or [])}
+    tags = _clean_tags((data.get("tags") if isinstance(data, dict) else None) or [])
+    _preferences_cache = (now, tags)
+    return {"tags": list(tags)}
 
 
-def _get_settings_telegram() -> Dict[str, Any]:
-    data = _db_get_app_state_json(APP_STATE_SETTINGS_TELEGRAM, DEFAULT_TELEGRAM)
+def _get_settings_telegram(conn: Optional[Connection] = None) -> Dict[str, Any]:
+    data = _db_get_app_state_json(APP_STATE_SETTINGS_TELEGRAM, DEFAULT_TELEGRAM, conn)
     if not isinstance(data, dict):
         return dict(DEFAULT_TELEGRAM)
     return {
@@ -2108,8 +2133,8 @@ def _get_settings_telegram() -> Dict[str, Any]:
     }
 
 
-def _get_settings_shop() -> Dict[str, Any]:
-    data = _db_get_app_state_json(APP_STATE_SETTINGS_SHOP, DEFAULT_SHOP_SETTINGS)
+def _get_settings_shop(conn: Optional[Connection] = None) -> Dict[str, Any]:
+    data = _db_get_app_state_json(APP_STATE_SETTINGS_SHOP, DEFAULT_SHOP_SETTINGS, conn)
     if not isinstance(data, dict):
         return dict(DEFAULT_SHOP_SETTINGS)
     mode = data.get("shop_output_mode", SHOP_OUTPUT_AI)
@@ -2154,7 +2179,7 @@ def _normalize_activities_transport(value: Optional[str], fallback: str) -> str:
         cleaned = "oev"
     if cleaned in {"zufuss", "zufus"}:
         cleaned = "zu_fuss"
-    if cleaned in {"auto", "oev", "zu_fuss", "egal"}:
+    if cleaned in ACTIVITIES_TRANSPORT_OPTIONS:
         return cleaned
     return fallback
 
@@ -2208,94 +2233,71 @@ def _normalize_home_parent_energy(value: Optional[str], fallback: str) -> str:
     return mapping.get(cleaned, fallback)
 
 
-def _normalize_activities_settings(
-    raw: Any, fallback: Optional[Dict[str, Any]] = None
-) -> Dict[str, Any]:
-    base = dict(DEFAULT_ACTIVITIES_SETTINGS)
-    if fallback:
-        base.update(fallback)
-    if not isinstance(raw, dict):
-        return base
+def _coerce_settings_text(value: Any, fallback: Any) -> str:
+    return str(value or fallback).strip()
 
-    default_location = str(raw.get("default_location") or base["default_location"]).strip()
-    max_travel_raw = raw.get("max_travel_min", base["max_travel_min"])
-    max_travel = base["max_travel_min"]
-    if isinstance(max_travel_raw, int):
-        max_travel = max_travel_raw
-    elif isinstance(max_travel_raw, str) and max_travel_raw.isdigit():
-        max_travel = int(max_travel_raw)
-    if max_travel not in ACTIVITIES_MAX_TRAVEL_OPTIONS:
-        max_travel = base["max_travel_min"]
 
-    budget = _normalize_activities_budget(raw.get("budget"), base["budget"])
-    transport = _normalize_activities_transport(raw.get("transport"), base["transport"])
+def _coerce_settings_int(value: Any, fallback: Any) -> Any:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return fallback
+
 
-    types_raw = raw.get("types", base["types"])
-    types: List[str] = []
-    if isinstance(types_raw, list):
+def _coerce_settings_bool(value: Any, fallback: Any) -> bool:
+    return bool(value)
+
+
+def _coerce_settings_labels(value: Any, fallback: Any) -> List[str]:
+    labels: List[str] = []
+    if isinstance(value, list):
         seen = set()
-        for item in types_raw:
+        for item in value:
             label = str(item or "").strip()
             if not label or label in seen:
                 continue
             seen.add(label)
-            types.append(label)
-
-    use_weather = bool(raw.get("use_weather", base["use_weather"]))
-    prefer_mountains = bool(raw.get("prefer_mountains", base["prefer_mountains"]))
-
-    home_duration_raw = raw.get("home_duration_min", base["home_duration_min"])
-    home_duration_min = base["home_duration_min"]
-    if isinstance(home_duration_raw, int):
-        home_duration_min = home_duration_raw
-    elif isinstance(home_duration_raw, str) and home_duration_raw.isdigit():
-        home_duration_min = int(home_duration_raw)
-    if home_duration_min not in HOME_ACTIVITY_DURATION_OPTIONS:
-        home_duration_min = base["home_duration_min"]
-
-    home_energy = _normalize_home_energy(raw.get("home_energy"), base["home_energy"])
-    home_mess_level = _normalize_home_mess_level(raw.get("home_mess_level"), base["home_mess_level"])
-    home_space = _normalize_home_space(raw.get("home_space"), base["home_space"])
-    home_parent_energy = _normalize_home_parent_energy(raw.get("home_parent_energy"), base["home_parent_energy"])
-
-    home_materials_raw = raw.get("home_materials", base["home_materials"])
-    home_materials: List[str] = []
-    if isinstance(home_materials_raw, list):
-        seen_materials = set()
-        for item in home_materials_raw:
-            label = str(item or "").strip()
-            if not label or label in seen_materials:
-                continue
-            seen_materials.add(label)
-            home_materials.append(label)
-
-    home_types_raw = raw.get("home_types", base["home_types"])
-    home_types: List[str] = []
-    if isinstance(home_types_raw, list):
-        seen_home_types = set()
-        for item in home_types_raw:
-            label = str(item or "").strip()
-            if not label or label in seen_home_types:
-                continue
-            seen_home_types.add(label)
-            home_types.append(label)
+            labels.append(label)
+    return labels
+
+
+# (key, coerce(value, fallback), allowed values or None); order defines the output order.
+_ACTIVITIES_SETTINGS_FIELDS: Tuple[Tuple[str, Callable[[Any, Any], Any], Optional[frozenset]], ...] = (
+    ("default_location", _coerce_settings_text, None),
+    ("max_travel_min", _coerce_settings_int, ACTIVITIES_MAX_TRAVEL_OPTIONS),
+    ("budget", _normalize_activities_budget, None),
+    ("transport", _normalize_activities_transport, None),
+    ("types", _coerce_settings_labels, None),
+    ("use_weather", _coerce_settings_bool, None),
+    ("prefer_mountains", _coerce_settings_bool, None),
+    ("home_duration_min", _coerce_settings_int, HOME_ACTIVITY_DURATION_OPTIONS),
+    ("home_energy", _normalize_home_energy, None),
+    ("home_mess_level", _normalize_home_mess_level, None),
+    ("home_space", _normalize_home_space, None),
+    ("home_parent_energy", _normalize_home_parent_energy, None),
+    ("home_materials", _coerce_settings_labels, None),
+    ("home_types", _coerce_settings_labels, None),
+)
 
-    return {
-        "default_location": default_location,
-        "max_travel_min": max_travel,
-        "budget": budget,
-        "transport": transport,
-        "types": types,
-        "use_weather": use_weather,
-        "prefer_mountains": prefer_mountains,
-        "home_duration_min": home_duration_min,
-        "home_energy": home_energy,
-        "home_mess_level": home_mess_level,
-        "home_space": home_space,
-        "home_parent_energy": home_parent_energy,
-        "home_materials": home_materials,
-        "home_types": home_types,
-    }
+
+def _normalize_activities_settings(
+    raw: Any, fallback: Optional[Mapping[str, Any]] = None
+) -> Dict[str, Any]:
+    base = _fresh_settings_defaults(DEFAULT_ACTIVITIES_SETTINGS)
+    if fallback:
+        base.update(fallback)
+    if not isinstance(raw, dict):
+        return base
+
+    normalized: Dict[str, Any] = {}
+    for key, coerce, allowed in _ACTIVITIES_SETTINGS_FIELDS:
+        default = base[key]
+        value = coerce(raw.get(key, default), default)
+        if allowed is not None and value not in allowed:
+            value = default
+        normalized[key] = value
+    return normalized
 
 
 def _get_settings_activities() -> Dict[str, Any]:
@@ -2304,7 +2306,7 @@ def _get_settings_activities() -> Dict[str, Any]:
 
 
 def _normalize_birthday_settings(raw: Any, fallback: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    base = dict(DEFAULT_BIRTHDAY_SETTINGS)
+    base = _fresh_settings_defaults(DEFAULT_BIRTHDAY_SETTINGS)
     if fallback:
         base.update(fallback)
     if not isinstance(raw, dict):
@@ -2359,6 +2361,22 @@ def _send_telegram_sync(chat_id: int, text_msg: str, parse_mode: Optional[str] =
         loop.create_task(_tg_send(chat_id, text_msg, parse_mode))
 
 
+# Last chat id this process stored; the webhook is the only writer of that key.
+_tg_stored_chat_id: Optional[int] = None
+
+
+def _remember_telegram_chat(chat_id: int) -> None:
+    """Persist the chat id for outbound notifications, skipping the write when it is unchanged."""
+    global _tg_stored_chat_id
+    if chat_id == _tg_stored_chat_id:
+        return
+    try:
+        _db_set_app_state_value(APP_STATE_TELEGRAM_LAST_CHAT_ID, str(chat_id))
+    except Exception:
+        return
+    _tg_stored_chat_id = chat_id
+
+
 def _telegram_registered_chat_id() -> Optional[int]:
     raw = _db_get_app_state_value(APP_STATE_TELEGRAM_LAST_CHAT_ID)
     if not raw:
@@ -2729,6 +2747,7 @@ def api_create_recipe(payload: RecipeCreate):
         session.add(r)
         session.commit()
         session.refresh(r)
+        swap_service.invalidate_recipe_pool()
         if r.photo_url:
             try:
                 _store_recipe_photo(session, r.id, r.photo_url)
@@ -2757,6 +2776,11 @@ def api_update_recipe(recipe_id: UUID, payload: RecipeUpdate):
         session.add(r)
         session.commit()
         session.refresh(r)
+        if "ingredients" in data or "title" in data:
+            _clear_shop_payload_cache()
+        _invalidate_day_recipe(r.id)
+        if "tags" in data or "is_active" in data:
+            swap_service.invalidate_recipe_pool()
         if "photo_url" in data:
             try:
                 if r.photo_url:
@@ -2834,6 +2858,7 @@ def api_delete_recipe(recipe_id: UUID):
         r.is_active = False
         session.add(r)
         session.commit()
+        swap_service.invalidate_recipe_pool()
         return {"ok": True}
 
 
@@ -2848,6 +2873,7 @@ def api_archive_recipe(recipe_id: UUID):
         r.is_active = False
         session.add(r)
         session.commit()
+        swap_service.invalidate_recipe_pool()
         return {"ok": True, "id": str(r.id), "is_active": False}
 
 
@@ -2877,7 +2903,7 @@ def api_put_settings_pantry(payload: PantrySettingsPayload):
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     cleaned = _validate_pantry_items(payload.items or [])
-    _db_set_app_state_value(APP_STATE_SETTINGS_PANTRY, json.dumps({"items": cleaned}))
+    _db_set_app_state_value(APP_STATE_SETTINGS_PANTRY, json_utils.dumps({"items": cleaned}))
     return {"ok": True, "pantry": {"items": cleaned}}
 
 
@@ -2894,11 +2920,13 @@ def api_get_settings_pantry_suggestions():
 
 @app.put("/api/settings/preferences")
 def api_put_settings_preferences(payload: PreferencesSettingsPayload):
+    global _preferences_cache
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     tags = _clean_tags(payload.tags or [])
     data = {"tags": tags}
-    _db_set_app_state_value(APP_STATE_SETTINGS_PREFERENCES, json.dumps(data))
+    _db_set_app_state_value(APP_STATE_SETTINGS_PREFERENCES, json_utils.dumps(data))
+    _preferences_cache = None
     return {"ok": True, "preferences": data}
 
 
@@ -2919,7 +2947,7 @@ def api_put_settings_telegram(payload: TelegramSettingsPayload):
         "notify_new_birthday": bool(payload.notify_new_birthday),
         "notify_new_family_member": bool(payload.notify_new_family_member),
     }
-    _db_set_app_state_value(APP_STATE_SETTINGS_TELEGRAM, json.dumps(data))
+    _db_set_app_state_value(APP_STATE_SETTINGS_TELEGRAM, json_utils.dumps(data))
     return {"ok": True, "telegram": data}
 
 
@@ -2937,7 +2965,7 @@ def api_put_settings_shop(payload: ShopSettingsPayload):
         "shopping_list_open_after_create": bool(payload.shopping_list_open_after_create),
         "shopping_list_estimate_currency": payload.shopping_list_estimate_currency,
     }
-    _db_set_app_state_value(APP_STATE_SETTINGS_SHOP, json.dumps(data))
+    _db_set_app_state_value(APP_STATE_SETTINGS_SHOP, json_utils.dumps(data))
     return {"ok": True, "shop": data}
 
 
@@ -3405,8 +3433,9 @@ def api_put_activities_settings(payload: ActivitiesSettingsPayload):
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     current = _get_settings_activities()
-    normalized = _normalize_activities_settings(payload.model_dump(), current)
-    _db_set_app_state_value(APP_STATE_SETTINGS_ACTIVITIES, json.dumps(normalized, ensure_ascii=False))
+    # Fields the client did not send fall back to the stored settings.
+    normalized = _normalize_activities_settings(payload.model_dump(exclude_unset=True), current)
+    _db_set_app_state_value(APP_STATE_SETTINGS_ACTIVITIES, json_utils.dumps(normalized))
     return {"ok": True, "settings": normalized}
 
 
@@ -3423,7 +3452,7 @@ def api_put_birthdays_settings(payload: BirthdaySettingsPayload):
         raise HTTPException(500, "DATABASE_URL missing")
     current = _get_settings_birthdays()
     normalized = _normalize_birthday_settings(payload.model_dump(), current)
-    _db_set_app_state_value(APP_STATE_SETTINGS_BIRTHDAYS, json.dumps(normalized, ensure_ascii=False))
+    _db_set_app_state_value(APP_STATE_SETTINGS_BIRTHDAYS, json_utils.dumps(normalized))
     return {"ok": True, "settings": normalized}
 
 
@@ -3446,9 +3475,11 @@ def api_generate_activities(payload: ActivitiesGeneratePayload):
     if max_travel not in ACTIVITIES_MAX_TRAVEL_OPTIONS:
         return {"ok": False, "error": "Ungültige Fahrzeit."}
 
-    settings = _get_settings_activities()
+    # The UI sends the full settings it loaded; only hit the DB without a snapshot.
     if payload.settings_snapshot:
-        settings = _normalize_activities_settings(payload.settings_snapshot, settings)
+        settings = _normalize_activities_settings(payload.settings_snapshot)
+    else:
+        settings = _get_settings_activities()
 
     payload.location_text = location_text
     payload.time_left_bucket = time_bucket
@@ -3470,9 +3501,11 @@ def api_generate_home_activities(payload: HomeActivitiesGeneratePayload):
     if not os.getenv("OPENAI_API_KEY"):
         return {"ok": False, "error": "AI nicht konfiguriert."}
 
-    settings = _get_settings_activities()
+    # The UI sends the full settings it loaded; only hit the DB without a snapshot.
     if payload.settings_snapshot:
-        settings = _normalize_activities_settings(payload.settings_snapshot, settings)
+        settings = _normalize_activities_settings(payload.settings_snapshot)
+    else:
+        settings = _get_settings_activities()
 
     if payload.duration_min not in HOME_ACTIVITY_DURATION_OPTIONS:
         return {"ok": False, "error": "Ungültige Dauer."}
@@ -3551,8 +3584,9 @@ def api_weekly_current():
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     week_start = _current_week_start()
-    base = _db_get_weekly_plan(week_start)
-    draft = _db_get_draft(week_start)
+    with engine.connect() as conn:
+        base = _db_get_weekly_plan(week_start, conn)
+        draft = _db_get_draft(week_start, conn)
 
     plan_payload = _build_plan_payload(base["days"]) if base else None
     draft_payload = None
@@ -3627,14 +3661,22 @@ class WeeklyPlanCreateRequest(BaseModel):
 def api_weekly_plan(notify: int = 0, payload: Optional[WeeklyPlanCreateRequest] = None):
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
-    week_start = _current_week_start()
+    return _create_weekly_plan(_current_week_start(), notify, payload)
+
+
+def _create_weekly_plan(
+    week_start: date,
+    notify: int = 0,
+    payload: Optional[WeeklyPlanCreateRequest] = None,
+) -> Dict[str, Any]:
     start_day = payload.start_day if payload and payload.start_day else 1
     days_count = payload.days_count if payload and payload.days_count else 8 - min(max(start_day, 1), 7)
     days = _build_new_week_plan(days_count, start_day)
     _db_upsert_weekly_plan(week_start, days)
 
-    base = _db_get_weekly_plan(week_start)
-    draft = _db_get_draft(week_start)
+    with engine.connect() as conn:
+        base = _db_get_weekly_plan(week_start, conn)
+        draft = _db_get_draft(week_start, conn)
     plan_payload = _build_plan_payload(base["days"]) if base else None
     draft_payload = None
     if draft:
@@ -3673,7 +3715,9 @@ def api_weekly_plan(notify: int = 0, payload: Optional[WeeklyPlanCreateRequest]
 
 
 def _run_swap_preview(week_start: date, swap_days: List[int]) -> Dict[str, Any]:
-    base = _db_get_weekly_plan(week_start)
+    with engine.connect() as conn:
+        base = _db_get_weekly_plan(week_start, conn)
+        draft = _db_get_draft(week_start, conn) if base else None
     if not base:
         return {
             "ok": False,
@@ -3682,13 +3726,13 @@ def _run_swap_preview(week_start: date, swap_days: List[int]) -> Dict[str, Any]:
         }
 
     base_plan_id = base["id"]
-    draft = _db_get_draft(week_start)
 
     if draft and draft.get("proposed_days"):
         base_days = draft.get("proposed_days") or {}
-        avoid_ids = set(_get_swap_avoid_list(week_start))
-        avoid_ids = swap_service.update_avoid_list_for_reroll(base_days, swap_days, avoid_ids)
-        _set_swap_avoid_list(week_start, list(avoid_ids))
+        stored_avoid_ids = set(_get_swap_avoid_list(week_start))
+        avoid_ids = swap_service.update_avoid_list_for_reroll(base_days, swap_days, stored_avoid_ids)
+        if avoid_ids is not stored_avoid_ids:
+            _set_swap_avoid_list(week_start, list(avoid_ids))
     else:
         _clear_swap_avoid_list(week_start)
         avoid_ids = set()
@@ -3721,24 +3765,38 @@ def api_weekly_swap(payload: WeeklySwapRequest):
     return _run_swap_preview(week_start, swap_days)
 
 
+def _apply_weekly_draft(week_start: date) -> Optional[Dict[str, str]]:
+    """Promote the week's draft to the plan on one connection; None when no draft exists."""
+    with engine.begin() as conn:
+        # Deleting the draft claims it: a concurrent confirm waits on the row lock,
+        # then deletes nothing and reports "no draft" instead of applying it twice.
+        proposed = conn.execute(_SQL_TAKE_DRAFT, {"ws": week_start}).scalar()
+        if proposed is None:
+            return None
+        _db_upsert_weekly_plan(week_start, proposed, conn)
+        _clear_swap_avoid_list(week_start, conn)
+    return proposed
+
+
+def _discard_weekly_draft(week_start: date) -> None:
+    with engine.begin() as conn:
+        _db_delete_draft(week_start, conn)
+        _clear_swap_avoid_list(week_start, conn)
+
+
 @app.post("/api/weekly/confirm")
 def api_weekly_confirm():
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     week_start = _current_week_start()
-    d = _db_get_draft(week_start)
-    if not d:
+    proposed = _apply_weekly_draft(week_start)
+    if proposed is None:
         return {
             "ok": False,
             "week_start": week_start.isoformat(),
             "message": "Kein Draft vorhanden. Nutze erst `swap ...`.",
         }
 
-    proposed = d["proposed_days"]
-    _db_upsert_weekly_plan(week_start, proposed)
-    _db_delete_draft(week_start)
-    _clear_swap_avoid_list(week_start)
-
     plan_payload = _build_plan_payload(proposed)
     return {
         "ok": True,
@@ -3756,17 +3814,54 @@ def api_weekly_cancel():
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     week_start = _current_week_start()
-    _db_delete_draft(week_start)
-    _clear_swap_avoid_list(week_start)
+    _discard_weekly_draft(week_start)
     return {"ok": True, "week_start": week_start.isoformat(), "message": "Draft verworfen."}
 
 
+SHOP_PAYLOAD_CACHE_MAX_ENTRIES = 16
+_shop_payload_cache: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+_shop_payload_cache_lock = threading.Lock()
+
+
+def _clear_shop_payload_cache() -> None:
+    with _shop_payload_cache_lock:
+        _shop_payload_cache.clear()
+
+
+def _cached_shop_payload(
+    mode: Optional[str],
+    days: Dict[str, str],
+    pantry_items: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    # The shop payload is a pure function of plan days, pantry and output mode
+    # (plus recipe ingredients, which invalidate via _clear_shop_payload_cache).
+    key = (mode or "", json_utils.dumps(days, sort_keys=True), json_utils.dumps(pantry_items, sort_keys=True))
+    with _shop_payload_cache_lock:
+        cached = _shop_payload_cache.get(key)
+    # Callers get their own copy; nested lists/dicts must not alias the cached entry.
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    shop_payload = build_shop_payload(mode, days, engine, pantry_items)
+    # Warnings usually mean the AI step failed; retry those on the next request.
+    if not shop_payload.get("warning"):
+        with _shop_payload_cache_lock:
+            while len(_shop_payload_cache) >= SHOP_PAYLOAD_CACHE_MAX_ENTRIES:
+                _shop_payload_cache.pop(next(iter(_shop_payload_cache)))
+            _shop_payload_cache[key] = shop_payload
+    return copy.deepcopy(shop_payload)
+
+
 @app.get("/api/weekly/shop")
 def api_weekly_shop(notify: int = 0):
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     week_start = _current_week_start()
-    base = _db_get_weekly_plan(week_start)
+    with engine.connect() as conn:
+        base = _db_get_weekly_plan(week_start, conn)
+        if base:
+            shop_settings = _get_settings_shop(conn)
+            pantry_items = _get_settings_pantry(conn)
     if not base:
         return {
             "ok": False,
@@ -3776,12 +3871,10 @@ def api_weekly_shop(notify: int = 0):
         }
 
     days = base["days"]
-    shop_settings = _get_settings_shop()
-    shop_payload = build_shop_payload(
+    shop_payload = _cached_shop_payload(
         shop_settings.get("shop_output_mode"),
         days,
-        engine,
-        _get_settings_pantry(),
+        pantry_items,
     )
     response = {
         "ok": True,
@@ -3899,10 +3992,9 @@ def _current_week_shop_payload(mode: str) -> Tuple[Optional[Dict[str, Any]], Opt
     base = _db_get_weekly_plan(week_start)
     if not base:
         return None, f"Kein Wochenplan vorhanden für Woche ab {week_start.isoformat()}."
-    shop_payload = build_shop_payload(
+    shop_payload = _cached_shop_payload(
         mode,
         base["days"],
-        engine,
         _get_settings_pantry(),
     )
     return shop_payload, shop_payload.get("warning")
@@ -4288,12 +4380,28 @@ def api_estimate_shopping_list_total(list_id: UUID):
 # -----------------------------
 # Telegram helpers
 # -----------------------------
+# The async _tg_* handlers run on the event loop; every sync DB/AI call inside them
+# goes through asyncio.to_thread.
+_TG_ADD_PREFIX_RE = re.compile(r"^add\s+", re.IGNORECASE)
+_TG_SWAP_PREFIX_RE = re.compile(r"^swap\s+", re.IGNORECASE)
+_TG_NOTE_PREFIX_RE = re.compile(r"^/?notiz\s+", re.IGNORECASE)
+_TG_TASK_PREFIX_RE = re.compile(r"^/?aufgabe\s+", re.IGNORECASE)
+# Replies that leave an optional flow field empty.
+_TG_SKIP_ANSWERS = frozenset({"skip", "-", "nein"})
+
+
 def _is_allowed(from_id: int) -> bool:
-    allowlist = os.getenv("TELEGRAM_ALLOWLIST", "").strip()
-    if not allowlist:
-        return True
-    allowed_ids = {x.strip() for x in allowlist.split(",") if x.strip()}
-    return str(from_id) in allowed_ids
+    return not TELEGRAM_ALLOWLIST or str(from_id) in TELEGRAM_ALLOWLIST
+
+
+async def _tg_post(token: str, method: str, payload: Dict[str, Any]) -> httpx.Response:
+    path = f"/bot{token}/{method}"
+    # The pooled client is bound to the server loop; _send_telegram_sync runs
+    # its own loop via asyncio.run and needs a short-lived client instead.
+    if _tg_client is not None and asyncio.get_running_loop() is _tg_client_loop:
+        return await _tg_client.post(path, json=payload)
+    async with httpx.AsyncClient(base_url=TELEGRAM_API_BASE_URL, timeout=20) as client:
+        return await client.post(path, json=payload)
 
 
 async def _tg_send(chat_id: int, text_msg: str, parse_mode: Optional[str] = None) -> None:
@@ -4302,30 +4410,37 @@ async def _tg_send(chat_id: int, text_msg: str, parse_mode: Optional[str] = None
         print("TELEGRAM_BOT_TOKEN missing", flush=True)
         return
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            payload: Dict[str, Any] = {"chat_id": chat_id, "text": text_msg}
-            if parse_mode:
-                payload["parse_mode"] = parse_mode
-            r = await client.post(url, json=payload)
-            if r.status_code != 200:
-                print(f"Telegram send failed: {r.status_code} {r.text}", flush=True)
+        payload: Dict[str, Any] = {"chat_id": chat_id, "text": text_msg}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        r = await _tg_post(token, "sendMessage", payload)
+        if r.status_code != 200:
+            print(f"Telegram send failed: {r.status_code} {r.text}", flush=True)
     except Exception as e:
         print(f"Telegram send exception: {e}", flush=True)
 
 
+# Strong references keep fire-and-forget sends alive until they complete.
+_tg_background_tasks: set = set()
+
+
+def _spawn_tg(chat_id: int, text_msg: str, parse_mode: Optional[str] = None) -> None:
+    """Schedule a reply without holding the webhook response; _tg_send logs its own failures."""
+    task = asyncio.create_task(_tg_send(chat_id, text_msg, parse_mode))
+    _tg_background_tasks.add(task)
+    task.add_done_callback(_tg_background_tasks.discard)
+
+
 async def _tg_api(method: str, payload: Dict[str, Any]) -> None:
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not token:
         print("TELEGRAM_BOT_TOKEN missing", flush=True)
         return
-    url = f"https://api.telegram.org/bot{token}/{method}"
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.post(url, json=payload)
-            if r.status_code != 200:
-                print(f"Telegram {method} failed: {r.status_code} {r.text}", flush=True)
+        r = await _tg_post(token, method, payload)
+        if r.status_code != 200:
+            print(f"Telegram {method} failed: {r.status_code} {r.text}", flush=True)
     except Exception as e:
         print(f"Telegram {method} exception: {e}", flush=True)
 
@@ -4371,11 +4486,11 @@ def _tg_get_state(chat_id: int) -> Dict[str, Any]:
 
 
 def _tg_set_state(chat_id: int, state: Dict[str, Any]) -> None:
-    _db_set_app_state_value(_tg_state_key(chat_id), json.dumps(state, ensure_ascii=False))
+    _db_set_app_state_value(_tg_state_key(chat_id), json_utils.dumps(state))
 
 
 def _tg_clear_state(chat_id: int) -> None:
-    _db_set_app_state_value(_tg_state_key(chat_id), json.dumps({}))
+    _db_set_app_state_value(_tg_state_key(chat_id), json_utils.dumps({}))
 
 
 def _tg_main_menu_rows() -> List[List[Tuple[str, str]]]:
@@ -4558,25 +4673,28 @@ def _week_start_monday(d: date) -> date:
 # Schedule Heart Beat
 #-----------------------------
 
-def _db_set_scheduler_heartbeat():
+SCHEDULER_HEARTBEAT_MIN_INTERVAL_SECONDS = 60.0
+_scheduler_heartbeat_written_at: Optional[float] = None
+
+
+def _db_set_scheduler_heartbeat(conn: Optional[Connection] = None):
+    global _scheduler_heartbeat_written_at
     if engine is None:
         return
-    from datetime import datetime, timezone
-    from sqlalchemy import text
+    # Coalesce frequent callers: one row update per interval is enough for /api/jobs/status.
+    now = time.monotonic()
+    last = _scheduler_heartbeat_written_at
+    if last is not None and now - last < SCHEDULER_HEARTBEAT_MIN_INTERVAL_SECONDS:
+        return
+    from datetime import timezone
 
+    if conn is None:
+        with engine.begin() as conn:
+            _db_set_scheduler_heartbeat(conn)
+        return
     ts = datetime.now(timezone.utc).isoformat()
-    with engine.connect() as conn:
-        conn.execute(
-            text(
-                """
-                insert into public.app_state (key, value)
-                values ('scheduler_last_run', :v)
-                on conflict (key) do update set value = excluded.value, updated_at = now()
-                """
-            ),
-            {"v": ts},
-        )
-        conn.commit()
+    conn.execute(_SQL_UPSERT_APP_STATE, {"k": APP_STATE_SCHEDULER_LAST_RUN, "v": ts})
+    _scheduler_heartbeat_written_at = now
 
 
 # -----------------------------
@@ -4584,7 +4702,7 @@ def _db_set_scheduler_heartbeat():
 # -----------------------------
 def _parse_add(message_text: str) -> Dict[str, Any]:
     raw = message_text.strip()
-    raw = re.sub(r"^add\s+", "", raw, flags=re.IGNORECASE).strip()
+    raw = _TG_ADD_PREFIX_RE.sub("", raw, count=1).strip()
 
 
     # Pipe-aware parsing: each | chunk stays intact (so "ings=Eier, Tomaten (Dose)" works)
@@ -4651,20 +4769,30 @@ def _db_add_recipe(created_by: str, payload: Dict[str, Any]) -> Recipe:
         created_by=created_by,
     )
 
-    with Session(engine) as session:
+    # The INSERT already returns the generated id; keeping attributes loaded after
+    # commit avoids the extra SELECT that refresh() would issue.
+    with Session(engine, expire_on_commit=False) as session:
         session.add(recipe)
         session.commit()
-        session.refresh(recipe)
+    swap_service.invalidate_recipe_pool()
 
     return recipe
 
 
-def _db_list_recipes(limit: int = 10) -> List[Recipe]:
+def _db_list_recipes(limit: int = 10) -> List[Row]:
+    """Latest active recipes as lightweight rows with just the fields the Telegram lists show."""
     if engine is None:
         raise RuntimeError("DATABASE_URL missing")
     with Session(engine) as session:
         stmt = (
-            select(Recipe)
+            select(
+                Recipe.id,
+                Recipe.title,
+                Recipe.time_minutes,
+                Recipe.difficulty,
+                Recipe.tags,
+                Recipe.collection_name,
+            )
             .where(Recipe.is_active == True)  # noqa: E712
             .order_by(Recipe.created_at.desc())
             .limit(limit)
@@ -4674,90 +4802,99 @@ def _db_list_recipes(limit: int = 10) -> List[Recipe]:
 # -----------------------------
 # Weekly plan storage (raw SQL to jsonb tables)
 # -----------------------------
-def _db_get_weekly_plan(week_start: date) -> Optional[Dict[str, Any]]:
-    with engine.connect() as conn:
-        row = conn.execute(
-            sql_text("select id, week_start_date, days from public.weekly_plans where week_start_date = :ws"),
-            {"ws": week_start.isoformat()},
-        ).mappings().first()
-        return dict(row) if row else None
+_SQL_GET_WEEKLY_PLAN = sql_text("select id, week_start_date, days from public.weekly_plans where week_start_date = :ws")
+# jsonb parameters are typed so the driver adapts the dict itself (no json.dumps + ::jsonb cast).
+_SQL_UPSERT_WEEKLY_PLAN = sql_text("""
+    insert into public.weekly_plans (week_start_date, days)
+    values (:ws, :days)
+    on conflict (week_start_date)
+    do update set days = excluded.days, updated_at = now()
+""").bindparams(bindparam("days", type_=JSONB))
+_SQL_UPSERT_DRAFT = sql_text("""
+    insert into public.weekly_plan_drafts
+      (week_start_date, base_plan_id, proposed_days, requested_swaps, created_by)
+    values
+      (:ws, :base_plan_id, :proposed_days, :swaps, :created_by)
+    on conflict (week_start_date)
+    do update set base_plan_id = excluded.base_plan_id,
+                  proposed_days = excluded.proposed_days,
+                  requested_swaps = excluded.requested_swaps,
+                  created_by = excluded.created_by,
+                  created_at = now()
+""").bindparams(bindparam("proposed_days", type_=JSONB))
+_SQL_GET_DRAFT = sql_text("""
+    select id, week_start_date, base_plan_id, proposed_days, requested_swaps
+    from public.weekly_plan_drafts
+    where week_start_date = :ws
+""")
+_SQL_DELETE_DRAFT = sql_text("delete from public.weekly_plan_drafts where week_start_date = :ws")
+_SQL_TAKE_DRAFT = sql_text(
+    "delete from public.weekly_plan_drafts where week_start_date = :ws returning proposed_days"
+)
 
 
-def _db_upsert_weekly_plan(week_start: date, days: Dict[str, str]) -> None:
-    with engine.connect() as conn:
-        conn.execute(
-            sql_text("""
-                insert into public.weekly_plans (week_start_date, days)
-                values (:ws, (:days)::jsonb)
-                on conflict (week_start_date)
-                do update set days = excluded.days, updated_at = now()
-            """),
-            {"ws": week_start.isoformat(), "days": json.dumps(days)},
-        )
-        conn.commit()
+def _db_get_weekly_plan(week_start: date, conn: Optional[Connection] = None) -> Optional[Dict[str, Any]]:
+    if conn is None:
+        with engine.connect() as conn:
+            return _db_get_weekly_plan(week_start, conn)
+    row = conn.execute(_SQL_GET_WEEKLY_PLAN, {"ws": week_start}).mappings().first()
+    return dict(row) if row else None
 
-def _db_create_draft(week_start: date, base_plan_id: Optional[str], proposed_days: Dict[str, str], swaps: List[int]) -> None:
-    with engine.connect() as conn:
-        conn.execute(
-            sql_text("delete from public.weekly_plan_drafts where week_start_date = :ws"),
-            {"ws": week_start.isoformat()},
-        )
-        conn.execute(
-            sql_text("""
-                insert into public.weekly_plan_drafts
-                  (week_start_date, base_plan_id, proposed_days, requested_swaps, created_by)
-                values
-                  (:ws, :base_plan_id, (:proposed_days)::jsonb, :swaps, :created_by)
-            """),
-            {
-                "ws": week_start.isoformat(),
-                "base_plan_id": base_plan_id,  # can be NULL
-                "proposed_days": json.dumps(proposed_days),
-                "swaps": swaps,
-                "created_by": "dennis",
-            },
-        )
-        conn.commit()
 
-def _db_get_draft(week_start: date) -> Optional[Dict[str, Any]]:
-    with engine.connect() as conn:
-        row = conn.execute(
-            sql_text("""
-                select id, week_start_date, base_plan_id, proposed_days, requested_swaps
-                from public.weekly_plan_drafts
-                where week_start_date = :ws
-                order by created_at desc
-                limit 1
-            """),
-            {"ws": week_start.isoformat()},
-        ).mappings().first()
-        return dict(row) if row else None
+def _db_upsert_weekly_plan(week_start: date, days: Dict[str, str], conn: Optional[Connection] = None) -> None:
+    if conn is None:
+        with engine.begin() as conn:
+            _db_upsert_weekly_plan(week_start, days, conn)
+        return
+    conn.execute(_SQL_UPSERT_WEEKLY_PLAN, {"ws": week_start, "days": days})
+
+def _db_create_draft(
+    week_start: date,
+    base_plan_id: Optional[str],
+    proposed_days: Dict[str, str],
+    swaps: List[int],
+    conn: Optional[Connection] = None,
+) -> None:
+    if conn is None:
+        with engine.begin() as conn:
+            _db_create_draft(week_start, base_plan_id, proposed_days, swaps, conn)
+        return
+    conn.execute(
+        _SQL_UPSERT_DRAFT,
+        {
+            "ws": week_start,
+            "base_plan_id": base_plan_id,  # can be NULL
+            "proposed_days": proposed_days,
+            "swaps": swaps,
+            "created_by": "dennis",
+        },
+    )
 
+def _db_get_draft(week_start: date, conn: Optional[Connection] = None) -> Optional[Dict[str, Any]]:
+    if conn is None:
+        with engine.connect() as conn:
+            return _db_get_draft(week_start, conn)
+    row = conn.execute(_SQL_GET_DRAFT, {"ws": week_start}).mappings().first()
+    return dict(row) if row else None
 
-def _db_delete_draft(week_start: date) -> None:
-    with engine.connect() as conn:
-        conn.execute(sql_text("delete from public.weekly_plan_drafts where week_start_date = :ws"), {"ws": week_start.isoformat()})
-        conn.commit()
+
+def _db_delete_draft(week_start: date, conn: Optional[Connection] = None) -> None:
+    if conn is None:
+        with engine.begin() as conn:
+            _db_delete_draft(week_start, conn)
+        return
+    conn.execute(_SQL_DELETE_DRAFT, {"ws": week_start})
 
 
 # -----------------------------
 # Planning logic (MVP simple)
 # -----------------------------
-def _format_plan(days: Dict[str, str]) -> str:
+def _format_plan(days: Dict[str, str], recipes: Optional[Dict[str, Row]] = None) -> str:
+    if recipes is None:
+        recipes = _load_day_recipes(days)
     lines = ["🗓️ Wochenplan (Mo–So):"]
-    for i in range(1, 8):
-        rid = days.get(str(i))
-        label = DAY_LABELS[i]
-        if rid and rid.startswith("KI:"):
-            title = rid
-        else:
-            # resolve title from DB
-            title = rid or "—"
-            if rid:
-                with Session(engine) as session:
-                    r = session.get(Recipe, rid)
-                    if r:
-                        title = r.title
+    for i, label in DAY_LABELS.items():
+        title = _day_meta(days.get(str(i)), recipes)["title"]
         lines.append(f"{label}: {title}")
     lines.append("\nBefehle: swap 2 5 7  | swap di fr so | confirm | cancel | list")
     return "\n".join(lines)
@@ -4809,9 +4946,8 @@ def _build_new_week_plan(days_count: int = 7, start_day: int = 1) -> Dict[str, s
 
 def _parse_swap_days(cmd: str) -> List[int]:
     # accepts: "swap 2 5 7" or "swap di fr" or "swap 2,5,7"
-    raw = re.sub(r"^swap\s+", "", cmd.strip(), flags=re.IGNORECASE).strip()
-    raw = raw.replace(",", " ")
-    parts = [p.strip().lower() for p in raw.split() if p.strip()]
+    raw = _TG_SWAP_PREFIX_RE.sub("", cmd.strip(), count=1).strip()
+    parts = raw.replace(",", " ").lower().split()
     if not parts:
         raise ValueError("swap needs days (e.g. swap 2 5 7 or swap di fr so)")
 
@@ -4823,9 +4959,10 @@ def _parse_swap_days(cmd: str) -> List[int]:
                 raise ValueError("day numbers must be 1..7")
             days.append(n)
         else:
-            if p not in DAY_ALIASES:
+            alias = DAY_ALIASES.get(p)
+            if alias is None:
                 raise ValueError(f"unknown day: {p}")
-            days.append(DAY_ALIASES[p])
+            days.append(alias)
 
     # unique, sorted
     return sorted(set(days))
@@ -4836,27 +4973,78 @@ def _resolve_day_title(rid: Optional[str]) -> str:
 
 
 def _resolve_day_meta(rid: Optional[str]) -> Dict[str, Any]:
+    return _day_meta(rid, _load_day_recipes({"1": rid} if rid else {}))
+
+
+DAY_RECIPE_CACHE_TTL_SECONDS = 300.0
+DAY_RECIPE_CACHE_MAX_ENTRIES = 512
+# recipe id -> (loaded_at, (id, title, source_url, rating) row)
+_day_recipe_cache: "OrderedDict[str, Tuple[float, Row]]" = OrderedDict()
+_day_recipe_cache_lock = threading.Lock()
+
+
+def _invalidate_day_recipe(recipe_id: Any) -> None:
+    with _day_recipe_cache_lock:
+        _day_recipe_cache.pop(str(recipe_id), None)
+
+
+def _load_day_recipes(days: Dict[str, str]) -> Dict[str, Row]:
+    """Fetch all recipes referenced by a plan in one query, keyed by the plan's id string."""
+    now = time.monotonic()
+    found: Dict[str, Row] = {}
+    missing: Dict[str, UUID] = {}
+    with _day_recipe_cache_lock:
+        for rid in days.values():
+            if not rid or rid.startswith("KI:") or rid in found or rid in missing:
+                continue
+            cached = _day_recipe_cache.get(rid)
+            if cached is not None and now - cached[0] < DAY_RECIPE_CACHE_TTL_SECONDS:
+                _day_recipe_cache.move_to_end(rid)
+                found[rid] = cached[1]
+                continue
+            try:
+                missing[rid] = UUID(rid)
+            except (TypeError, ValueError):
+                continue
+    if not missing:
+        return found
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Recipe.id, Recipe.title, Recipe.source_url, Recipe.rating).where(
+                Recipe.id.in_(list(missing.values()))
+            )
+        ).all()
+    with _day_recipe_cache_lock:
+        for r in rows:
+            key = str(r.id)
+            found[key] = r
+            _day_recipe_cache[key] = (now, r)
+            _day_recipe_cache.move_to_end(key)
+        while len(_day_recipe_cache) > DAY_RECIPE_CACHE_MAX_ENTRIES:
+            _day_recipe_cache.popitem(last=False)
+    return found
+
+
+def _day_meta(rid: Optional[str], recipes: Dict[str, Row]) -> Dict[str, Any]:
     if not rid:
         return {"title": "—", "source_url": None, "rating": None}
-    if rid.startswith("KI:"):
+    r = recipes.get(rid)
+    if r is None:
         return {"title": rid, "source_url": None, "rating": None}
-    title = rid
-    source_url = None
-    rating = None
-    with Session(engine) as session:
-        r = session.get(Recipe, rid)
-        if r:
-            title = r.title
-            source_url = r.source_url
-            rating = float(r.rating) if r.rating is not None else None
-    return {"title": title, "source_url": source_url, "rating": rating}
+    return {
+        "title": r.title,
+        "source_url": r.source_url,
+        "rating": float(r.rating) if r.rating is not None else None,
+    }
 
 
-def _build_day_entries(days: Dict[str, str]) -> List[Dict[str, Any]]:
+def _build_day_entries(days: Dict[str, str], recipes: Optional[Dict[str, Row]] = None) -> List[Dict[str, Any]]:
+    if recipes is None:
+        recipes = _load_day_recipes(days)
     entries: List[Dict[str, Any]] = []
-    for i in range(1, 8):
+    for i, label in DAY_LABELS.items():
         rid = days.get(str(i))
-        meta = _resolve_day_meta(rid)
+        meta = _day_meta(rid, recipes)
         if not rid:
             kind = "empty"
             recipe_id = None
@@ -4869,7 +5057,7 @@ def _build_day_entries(days: Dict[str, str]) -> List[Dict[str, Any]]:
         entries.append(
             {
                 "day": i,
-                "label": DAY_LABELS[i],
+                "label": label,
                 "kind": kind,
                 "recipe_id": recipe_id,
                 "title": meta["title"],
@@ -4881,18 +5069,20 @@ def _build_day_entries(days: Dict[str, str]) -> List[Dict[str, Any]]:
 
 
 def _build_plan_payload(days: Dict[str, str]) -> Dict[str, Any]:
+    recipes = _load_day_recipes(days)
     return {
-        "days": _build_day_entries(days),
+        "days": _build_day_entries(days, recipes),
         "raw_days": days,
-        "message": _format_plan(days),
+        "message": _format_plan(days, recipes),
     }
 
 
 def _build_draft_payload(proposed_days: Dict[str, str], requested_swaps: List[int]) -> Dict[str, Any]:
-    preview = "🔁 Vorschau (noch NICHT übernommen). Nutze `confirm` oder `cancel`.\n\n" + _format_plan(proposed_days)
+    recipes = _load_day_recipes(proposed_days)
+    preview = "🔁 Vorschau (noch NICHT übernommen). Nutze `confirm` oder `cancel`.\n\n" + _format_plan(proposed_days, recipes)
     return {
         "requested_swaps": requested_swaps,
-        "proposed_days": _build_day_entries(proposed_days),
+        "proposed_days": _build_day_entries(proposed_days, recipes),
         "raw_proposed_days": proposed_days,
         "message": preview,
     }
@@ -4935,38 +5125,39 @@ async def _tg_show_recipes_menu(chat_id: int) -> None:
 
 
 async def _tg_send_current_plan(chat_id: int, week_start: date, today: date) -> None:
-    base = _db_get_weekly_plan(week_start)
+    base = await asyncio.to_thread(_db_get_weekly_plan, week_start)
     if not base:
         await _tg_send(chat_id, "Kein Plan vorhanden. Erst neuen Plan erzeugen.")
         return
-    await _tg_send(chat_id, _format_plan(base["days"]))
+    await _tg_send(chat_id, await asyncio.to_thread(_format_plan, base["days"]))
 
 
 async def _tg_send_today_summary(chat_id: int, week_start: date, today: date) -> None:
-    base = _db_get_weekly_plan(week_start)
+    base = await asyncio.to_thread(_db_get_weekly_plan, week_start)
     if not base:
         await _tg_send(chat_id, "Kein Plan vorhanden. Erst neuen Plan erzeugen.")
         return
     day_num = today.isoweekday()
     rid = base["days"].get(str(day_num))
-    title = _resolve_day_title(rid)
+    title = await asyncio.to_thread(_resolve_day_title, rid)
     tomorrow_num = (day_num % 7) + 1
     rid_tomorrow = base["days"].get(str(tomorrow_num))
-    title_tomorrow = _resolve_day_title(rid_tomorrow)
+    title_tomorrow = await asyncio.to_thread(_resolve_day_title, rid_tomorrow)
     await _tg_send(chat_id, f"🍳 {DAY_LABELS.get(day_num)}: {title}\n🗓️ {DAY_LABELS.get(tomorrow_num)}: {title_tomorrow}")
 
 
 async def _tg_send_weekly_shop(chat_id: int, week_start: date) -> None:
-    base = _db_get_weekly_plan(week_start)
+    base = await asyncio.to_thread(_db_get_weekly_plan, week_start)
     if not base:
         await _tg_send(chat_id, "Kein Plan vorhanden. Erst neuen Plan erzeugen.")
         return
-    shop_settings = _get_settings_shop()
-    shop_payload = build_shop_payload(
+    shop_settings = await asyncio.to_thread(_get_settings_shop)
+    pantry_items = await asyncio.to_thread(_get_settings_pantry)
+    shop_payload = await asyncio.to_thread(
+        _cached_shop_payload,
         shop_settings.get("shop_output_mode"),
         base["days"],
-        engine,
-        _get_settings_pantry(),
+        pantry_items,
     )
     await _tg_send(
         chat_id,
@@ -4976,7 +5167,7 @@ async def _tg_send_weekly_shop(chat_id: int, week_start: date) -> None:
 
 
 async def _tg_send_latest_expenses(chat_id: int) -> None:
-    result = api_list_expenses(limit=8)
+    result = await asyncio.to_thread(api_list_expenses, limit=8)
     expenses = result.get("expenses") or []
     if not expenses:
         await _tg_send(chat_id, "Noch keine Ausgaben gespeichert.")
@@ -4990,15 +5181,15 @@ async def _tg_send_latest_expenses(chat_id: int) -> None:
 
 
 async def _tg_send_expense_balance(chat_id: int) -> None:
-    await _tg_send(chat_id, _tg_format_expense_balance_report(api_expenses_balance()))
+    await _tg_send(chat_id, _tg_format_expense_balance_report(await asyncio.to_thread(api_expenses_balance)))
 
 
 async def _tg_send_expense_report(chat_id: int) -> None:
-    await _tg_send(chat_id, _tg_format_expense_report(api_expenses_report()))
+    await _tg_send(chat_id, _tg_format_expense_report(await asyncio.to_thread(api_expenses_report)))
 
 
 async def _tg_send_shopping_lists(chat_id: int) -> None:
-    result = api_list_shopping_lists()
+    result = await asyncio.to_thread(api_list_shopping_lists)
     items = result.get("items") or []
     if not items:
         await _tg_send_menu(chat_id, "Noch keine Einkaufslisten vorhanden.", [[("➕ Neue Liste", "shopping:add")], [("Zurück", "menu:shopping")]])
@@ -5015,7 +5206,7 @@ async def _tg_send_shopping_lists(chat_id: int) -> None:
 
 
 async def _tg_send_shopping_list_detail(chat_id: int, list_id: str) -> None:
-    item = api_get_shopping_list(UUID(list_id)).get("item")
+    item = (await asyncio.to_thread(api_get_shopping_list, UUID(list_id))).get("item")
     if not item:
         await _tg_send(chat_id, "Liste nicht gefunden.")
         return
@@ -5043,7 +5234,7 @@ async def _tg_send_shopping_list_detail(chat_id: int, list_id: str) -> None:
 
 
 async def _tg_send_finance_overview(chat_id: int) -> None:
-    dashboard = api_finance_dashboard().get("dashboard") or {}
+    dashboard = (await asyncio.to_thread(api_finance_dashboard)).get("dashboard") or {}
     summary = dashboard.get("summary") or {}
     incomes = dashboard.get("incomes") or {}
     lines = [
@@ -5058,7 +5249,7 @@ async def _tg_send_finance_overview(chat_id: int) -> None:
 
 
 async def _tg_send_finance_person(chat_id: int, person: str) -> None:
-    dashboard = api_finance_dashboard().get("dashboard") or {}
+    dashboard = (await asyncio.to_thread(api_finance_dashboard)).get("dashboard") or {}
     info = (dashboard.get("people") or {}).get(person) or {}
     if not info:
         await _tg_send(chat_id, "Keine Daten vorhanden.")
@@ -5075,7 +5266,7 @@ async def _tg_send_finance_person(chat_id: int, person: str) -> None:
 
 
 async def _tg_send_finance_due(chat_id: int) -> None:
-    dashboard = api_finance_dashboard().get("dashboard") or {}
+    dashboard = (await asyncio.to_thread(api_finance_dashboard)).get("dashboard") or {}
     items = dashboard.get("upcoming_due_items") or []
     if not items:
         await _tg_send_menu(chat_id, "Keine Fälligkeiten vorhanden.", _tg_finance_rows())
@@ -5089,7 +5280,7 @@ async def _tg_send_finance_due(chat_id: int) -> None:
 
 
 async def _tg_send_finance_list(chat_id: int) -> None:
-    items = (api_list_fixed_expenses().get("items") or [])[:8]
+    items = ((await asyncio.to_thread(api_list_fixed_expenses)).get("items") or [])[:8]
     if not items:
         await _tg_send_menu(chat_id, "Noch keine Fixkosten erfasst.", [[("➕ Fixkosten", "finance:add")], [("Zurück", "menu:finance")]])
         return
@@ -5102,7 +5293,7 @@ async def _tg_send_finance_list(chat_id: int) -> None:
 
 
 async def _tg_send_chores(chat_id: int) -> None:
-    result = api_list_chores()
+    result = await asyncio.to_thread(api_list_chores)
     chores = result.get("chores") or []
     if not chores:
         await _tg_send(chat_id, "Keine offenen Aufgaben.")
@@ -5115,7 +5306,7 @@ async def _tg_send_chores(chat_id: int) -> None:
 
 
 async def _tg_send_chore_stats(chat_id: int) -> None:
-    result = api_chore_stats()
+    result = await asyncio.to_thread(api_chore_stats)
     scores = result.get("scores") or []
     if not scores:
         await _tg_send(chat_id, "Noch keine Punkte im aktuellen Monat.")
@@ -5127,7 +5318,7 @@ async def _tg_send_chore_stats(chat_id: int) -> None:
 
 
 async def _tg_send_pinboard(chat_id: int) -> None:
-    result = api_list_pinboard()
+    result = await asyncio.to_thread(api_list_pinboard)
     notes = result.get("notes") or []
     if not notes:
         await _tg_send(chat_id, "Keine Pinnwand-Einträge vorhanden.")
@@ -5140,7 +5331,7 @@ async def _tg_send_pinboard(chat_id: int) -> None:
 
 
 async def _tg_send_birthdays(chat_id: int) -> None:
-    result = api_list_birthdays()
+    result = await asyncio.to_thread(api_list_birthdays)
     birthdays = result.get("birthdays") or []
     if not birthdays:
         await _tg_send(chat_id, "Keine Geburtstage gespeichert.")
@@ -5166,7 +5357,7 @@ def _tg_birthday_picker_rows() -> List[List[Tuple[str, str]]]:
 
 
 async def _tg_send_gift_picker(chat_id: int) -> None:
-    result = api_list_birthdays()
+    result = await asyncio.to_thread(api_list_birthdays)
     birthdays = result.get("birthdays") or []
     if not birthdays:
         await _tg_send_menu(chat_id, "Keine Geburtstage gespeichert.", [[("Zurück", "menu:birthdays")]])
@@ -5174,7 +5365,7 @@ async def _tg_send_gift_picker(chat_id: int) -> None:
     await _tg_send_menu(
         chat_id,
         "🎁 Für wen suchst du gerade ein Geschenk?",
-        _tg_birthday_picker_rows(),
+        await asyncio.to_thread(_tg_birthday_picker_rows),
     )
 
 
@@ -5207,7 +5398,7 @@ def _tg_format_gift_ideas(name: str, ideas: List[Dict[str, str]]) -> str:
 
 
 async def _tg_send_gift_ideas(chat_id: int, birthday_id: str, budget_label: str) -> None:
-    defaults = _get_settings_birthdays()
+    defaults = await asyncio.to_thread(_get_settings_birthdays)
     payload = GiftIdeasGeneratePayload(
         birthday_id=birthday_id,
         occasion=defaults.get("gift_default_occasion") or "Geburtstag",
@@ -5215,7 +5406,7 @@ async def _tg_send_gift_ideas(chat_id: int, birthday_id: str, budget_label: str)
         gift_types=defaults.get("gift_preferred_types") or [],
         constraints=defaults.get("gift_no_goes") or [],
     )
-    result = api_generate_gift_ideas(payload)
+    result = await asyncio.to_thread(api_generate_gift_ideas, payload)
     if not result.get("ok"):
         await _tg_send_menu(chat_id, result.get("error") or "Geschenkideen konnten nicht generiert werden.", [[("Zurück", "birthdays:gifts")]])
         return
@@ -5228,7 +5419,7 @@ async def _tg_send_gift_ideas(chat_id: int, birthday_id: str, budget_label: str)
 
 
 async def _tg_send_family(chat_id: int) -> None:
-    members = api_list_family().get("members") or []
+    members = (await asyncio.to_thread(api_list_family)).get("members") or []
     if not members:
         await _tg_send(chat_id, "Keine Familienmitglieder gespeichert.")
         return
@@ -5239,7 +5430,7 @@ async def _tg_send_family(chat_id: int) -> None:
 
 
 async def _tg_send_recipes(chat_id: int) -> None:
-    items = _db_list_recipes(limit=10)
+    items = await asyncio.to_thread(_db_list_recipes, limit=10)
     if not items:
         await _tg_send(chat_id, "Noch keine Rezepte gespeichert.")
         return
@@ -5263,7 +5454,7 @@ def _tg_start_flow(chat_id: int, flow: str, data: Optional[Dict[str, Any]] = Non
 
 
 async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
-    state = _tg_get_state(chat_id)
+    state = await asyncio.to_thread(_tg_get_state, chat_id)
     flow = state.get("flow")
     if not flow:
         return False
@@ -5276,7 +5467,7 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
     if flow == "expense_title":
         state["title"] = text_value
         state["flow"] = "expense_amount"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         await _tg_send_menu(chat_id, "Betrag? Beispiel: `24.90`", _tg_cancel_rows(), "Markdown")
         return True
 
@@ -5288,31 +5479,32 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
             return True
         state["amount"] = amount
         state["flow"] = "expense_paid_by"
-        _tg_set_state(chat_id, state)
-        rows = [[(member.name, f"flow:expense:paid:{member.id}")] for member in _tg_find_family_members()[:8]]
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
+        members = await asyncio.to_thread(_tg_find_family_members)
+        rows = [[(member.name, f"flow:expense:paid:{member.id}")] for member in members[:8]]
         rows.append([("Abbrechen", "flow:cancel")])
         await _tg_send_menu(chat_id, "Wer hat bezahlt?", rows)
         return True
 
     if flow == "expense_split":
-        members = _tg_find_family_members()
+        members = await asyncio.to_thread(_tg_find_family_members)
         if text_value.lower() == "alle":
             state["split_names"] = [member.name for member in members]
             state["split_ids"] = [str(member.id) for member in members if member.id]
         else:
-            names, ids = _tg_parse_member_names(text_value)
+            names, ids = await asyncio.to_thread(_tg_parse_member_names, text_value)
             if not names:
                 await _tg_send(chat_id, "Bitte `alle` oder Namen kommasepariert eingeben, z. B. `Dennis, Leni`.")
                 return True
             state["split_names"] = names
             state["split_ids"] = ids
         state["flow"] = "expense_notes"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         await _tg_send_menu(chat_id, "Optional Notiz eingeben oder `skip` schreiben.", _tg_cancel_rows())
         return True
 
     if flow == "expense_notes":
-        note = None if text_value.lower() in {"skip", "-", "nein"} else text_value
+        note = None if text_value.lower() in _TG_SKIP_ANSWERS else text_value
         payload = ExpenseCreate(
             title=state["title"],
             amount=float(state["amount"]),
@@ -5323,8 +5515,8 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
             category=state.get("category") or "Sonstiges",
             notes=note,
         )
-        result = api_create_expense(payload)
-        _tg_clear_state(chat_id)
+        result = await asyncio.to_thread(api_create_expense, payload)
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         expense = result["expense"]
         await _tg_send_menu(
             chat_id,
@@ -5336,12 +5528,12 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
     if flow == "shopping_title":
         state["title"] = text_value
         state["flow"] = "shopping_manual"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         await _tg_send_menu(chat_id, "Optional erster manueller Eintrag oder `skip`.", _tg_cancel_rows())
         return True
 
     if flow == "shopping_manual":
-        manual_items = [] if text_value.lower() in {"skip", "-", "nein"} else [text_value]
+        manual_items = [] if text_value.lower() in _TG_SKIP_ANSWERS else [text_value]
         payload = ShoppingListCreatePayload(
             title=state["title"],
             manual_items=manual_items,
@@ -5349,31 +5541,31 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
             import_mode=state.get("import_mode") or SHOP_OUTPUT_AI,
             view_mode=state.get("view_mode") or "checklist",
         )
-        result = api_create_shopping_list(payload)
-        _tg_clear_state(chat_id)
+        result = await asyncio.to_thread(api_create_shopping_list, payload)
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_send_shopping_list_detail(chat_id, result["item"]["id"])
         return True
 
     if flow == "shopping_add_item":
         list_id = state.get("list_id")
         if not list_id:
-            _tg_clear_state(chat_id)
+            await asyncio.to_thread(_tg_clear_state, chat_id)
             return True
-        result = api_add_shopping_list_item(UUID(list_id), ShoppingListItemPayload(content=text_value))
-        _tg_clear_state(chat_id)
+        result = await asyncio.to_thread(api_add_shopping_list_item, UUID(list_id), ShoppingListItemPayload(content=text_value))
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_send_shopping_list_detail(chat_id, result["item"]["id"])
         return True
 
     if flow == "chore_title":
-        result = api_create_chore(ChoreCreate(title=text_value))
-        _tg_clear_state(chat_id)
+        result = await asyncio.to_thread(api_create_chore, ChoreCreate(title=text_value))
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_send_menu(chat_id, f"✅ Aufgabe erstellt: {result.title}", _tg_chores_rows())
         return True
 
     if flow == "pinboard_content":
         state["content"] = text_value
         state["flow"] = "pinboard_tag"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         rows = [
             [("Allgemein", "flow:pinboard:tag:allgemein"), ("Schule", "flow:pinboard:tag:schule")],
             [("Einkauf", "flow:pinboard:tag:einkauf"), ("Wichtig", "flow:pinboard:tag:wichtig")],
@@ -5385,7 +5577,7 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
     if flow == "finance_name":
         state["name"] = text_value
         state["flow"] = "finance_amount"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         await _tg_send_menu(chat_id, "Wie hoch ist der Betrag in CHF?", _tg_cancel_rows())
         return True
 
@@ -5401,7 +5593,7 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
             return True
         state["amount"] = amount
         state["flow"] = "finance_interval_wait"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         rows = [[(label, f"flow:finance:interval:{key}")] for key, label in FINANCE_INTERVALS]
         rows.append([("Abbrechen", "flow:cancel")])
         await _tg_send_menu(chat_id, "Welches Intervall hat diese Fixkosten?", rows)
@@ -5421,8 +5613,8 @@ async def _tg_handle_flow_message(chat_id: int, text_value: str) -> bool:
             next_due_date=due_date,
             responsible_party=state.get("responsible_party") or "gemeinsam",
         )
-        result = api_create_fixed_expense(payload)
-        _tg_clear_state(chat_id)
+        result = await asyncio.to_thread(api_create_fixed_expense, payload)
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_send_menu(chat_id, f"✅ Fixkosten gespeichert: {result['item']['name']}", _tg_finance_rows())
         return True
 
@@ -5433,7 +5625,7 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
     await _tg_answer_callback(callback_id)
 
     if data == "menu:main":
-        _tg_clear_state(chat_id)
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_show_main_menu(chat_id)
         return
     if data == "menu:weekly":
@@ -5471,7 +5663,7 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         await _tg_send_current_plan(chat_id, week_start, today)
         return
     if data == "weekly:plan":
-        response = api_weekly_plan()
+        response = await asyncio.to_thread(_create_weekly_plan, week_start)
         await _tg_send(chat_id, response["message"])
         return
     if data == "weekly:shop":
@@ -5488,22 +5680,22 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         await _tg_send_expense_report(chat_id)
         return
     if data == "split:add":
-        _tg_start_flow(chat_id, "expense_title")
+        await asyncio.to_thread(_tg_start_flow, chat_id, "expense_title")
         await _tg_send_menu(chat_id, "Neue Ausgabe\n\nWofür war die Ausgabe?", _tg_cancel_rows())
         return
 
     if data.startswith("flow:expense:paid:"):
         member_id = data.split(":")[-1]
-        members = {str(member.id): member for member in _tg_find_family_members() if member.id}
+        members = {str(member.id): member for member in await asyncio.to_thread(_tg_find_family_members) if member.id}
         member = members.get(member_id)
         if not member:
             await _tg_send(chat_id, "Mitglied nicht gefunden.")
             return
-        state = _tg_get_state(chat_id)
+        state = await asyncio.to_thread(_tg_get_state, chat_id)
         state["paid_by_id"] = member_id
         state["paid_by_name"] = member.name
         state["flow"] = "expense_category"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         rows = [[(category, f"flow:expense:category:{category}")] for category in EXPENSE_CATEGORIES]
         rows.append([("Abbrechen", "flow:cancel")])
         await _tg_send_menu(chat_id, "Welche Kategorie?", rows)
@@ -5511,11 +5703,11 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
 
     if data.startswith("flow:expense:category:"):
         category = data.split(":", 3)[-1]
-        state = _tg_get_state(chat_id)
+        state = await asyncio.to_thread(_tg_get_state, chat_id)
         state["category"] = category
         state["flow"] = "expense_split"
-        _tg_set_state(chat_id, state)
-        members = _tg_find_family_members()
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
+        members = await asyncio.to_thread(_tg_find_family_members)
         hint = ", ".join(member.name for member in members[:6])
         await _tg_send_menu(
             chat_id,
@@ -5529,8 +5721,9 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         await _tg_send_shopping_lists(chat_id)
         return
     if data == "shopping:add":
-        defaults = _get_settings_shop()
-        _tg_start_flow(
+        defaults = await asyncio.to_thread(_get_settings_shop)
+        await asyncio.to_thread(
+            _tg_start_flow,
             chat_id,
             "shopping_title",
             {
@@ -5546,12 +5739,12 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         return
     if data.startswith("shopping:add-item:"):
         list_id = data.split(":")[-1]
-        _tg_start_flow(chat_id, "shopping_add_item", {"list_id": list_id})
+        await asyncio.to_thread(_tg_start_flow, chat_id, "shopping_add_item", {"list_id": list_id})
         await _tg_send_menu(chat_id, "Welchen Eintrag möchtest du hinzufügen?", _tg_cancel_rows())
         return
     if data.startswith("shopping:estimate:"):
         list_id = data.split(":")[-1]
-        result = api_estimate_shopping_list_total(UUID(list_id))
+        result = await asyncio.to_thread(api_estimate_shopping_list_total, UUID(list_id))
         if not result.get("ok"):
             await _tg_send(chat_id, result.get("error") or "Schätzung fehlgeschlagen.")
             return
@@ -5561,7 +5754,7 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         return
     if data.startswith("shopping:categorize:"):
         list_id = data.split(":")[-1]
-        result = api_categorize_shopping_list(UUID(list_id))
+        result = await asyncio.to_thread(api_categorize_shopping_list, UUID(list_id))
         if not result.get("ok"):
             await _tg_send(chat_id, result.get("error") or "Sortierung fehlgeschlagen.")
             return
@@ -5572,7 +5765,7 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         return
     if data.startswith("shopping:snapshot:"):
         list_id = data.split(":")[-1]
-        result = api_snapshot_weekly_into_shopping_list(UUID(list_id), ShoppingListSnapshotPayload(import_mode=None))
+        result = await asyncio.to_thread(api_snapshot_weekly_into_shopping_list, UUID(list_id), ShoppingListSnapshotPayload(import_mode=None))
         if result.get("warning"):
             await _tg_send(chat_id, result["warning"])
         await _tg_send_shopping_list_detail(chat_id, list_id)
@@ -5585,7 +5778,7 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         await _tg_send_chore_stats(chat_id)
         return
     if data == "chores:add":
-        _tg_start_flow(chat_id, "chore_title")
+        await asyncio.to_thread(_tg_start_flow, chat_id, "chore_title")
         await _tg_send_menu(chat_id, "Neue Aufgabe\n\nWie lautet der Titel?", _tg_cancel_rows())
         return
 
@@ -5593,19 +5786,19 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         await _tg_send_pinboard(chat_id)
         return
     if data == "pinboard:add":
-        _tg_start_flow(chat_id, "pinboard_content")
+        await asyncio.to_thread(_tg_start_flow, chat_id, "pinboard_content")
         await _tg_send_menu(chat_id, "Neue Pinnwand-Notiz\n\nWas soll gespeichert werden?", _tg_cancel_rows())
         return
     if data.startswith("flow:pinboard:tag:"):
         tag = data.split(":")[-1]
-        state = _tg_get_state(chat_id)
+        state = await asyncio.to_thread(_tg_get_state, chat_id)
         content = state.get("content")
         if not content:
-            _tg_clear_state(chat_id)
+            await asyncio.to_thread(_tg_clear_state, chat_id)
             await _tg_send(chat_id, "Notiz-Inhalt fehlt. Bitte neu starten.")
             return
-        result = api_create_pinboard_note(PinboardNoteCreate(content=content, author_name="Telegram", tag=tag))
-        _tg_clear_state(chat_id)
+        result = await asyncio.to_thread(api_create_pinboard_note, PinboardNoteCreate(content=content, author_name="Telegram", tag=tag))
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_send_menu(chat_id, f"📌 Notiz gespeichert ({tag}).", _tg_pinboard_rows())
         return
 
@@ -5639,7 +5832,7 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         await _tg_send_finance_list(chat_id)
         return
     if data == "finance:add":
-        _tg_start_flow(chat_id, "finance_name")
+        await asyncio.to_thread(_tg_start_flow, chat_id, "finance_name")
         rows = [[(label, f"flow:finance:category:{key}")] for key, label in FINANCE_CATEGORIES]
         rows.append([("Abbrechen", "flow:cancel")])
         await _tg_send_menu(chat_id, "Neue Fixkosten\n\nWähle zuerst die Kategorie.", rows)
@@ -5649,39 +5842,275 @@ async def _tg_handle_callback(chat_id: int, callback_id: str, data: str, today:
         return
     if data.startswith("flow:finance:category:"):
         category = data.split(":")[-1]
-        state = _tg_get_state(chat_id)
+        state = await asyncio.to_thread(_tg_get_state, chat_id)
         state["category"] = category
         state["flow"] = "finance_name"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         await _tg_send_menu(chat_id, "Wie heißt diese Fixkosten-Position?", _tg_cancel_rows())
         return
     if data.startswith("flow:finance:responsible:"):
         responsible = data.split(":")[-1]
-        state = _tg_get_state(chat_id)
+        state = await asyncio.to_thread(_tg_get_state, chat_id)
         state["responsible_party"] = responsible
         state["flow"] = "finance_due"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         await _tg_send_menu(chat_id, "Nächste Fälligkeit im Format YYYY-MM-DD", _tg_cancel_rows())
         return
     if data.startswith("flow:finance:interval:"):
         interval = data.split(":")[-1]
-        state = _tg_get_state(chat_id)
+        state = await asyncio.to_thread(_tg_get_state, chat_id)
         state["interval"] = interval
         state["flow"] = "finance_responsible_wait"
-        _tg_set_state(chat_id, state)
+        await asyncio.to_thread(_tg_set_state, chat_id, state)
         rows = [[(label, f"flow:finance:responsible:{key}")] for key, label in FINANCE_RESPONSIBLE_PARTIES]
         rows.append([("Abbrechen", "flow:cancel")])
         await _tg_send_menu(chat_id, "Wer trägt diese Kosten?", rows)
         return
 
     if data == "flow:cancel":
-        _tg_clear_state(chat_id)
+        await asyncio.to_thread(_tg_clear_state, chat_id)
         await _tg_show_main_menu(chat_id)
         return
 
     await _tg_show_main_menu(chat_id)
 
 
+# -----------------------------
+# Telegram text commands
+# -----------------------------
+# Text commands are plain sync functions (DB, plan building, AI shop output) that
+# return the reply text, or (text, parse_mode); the webhook runs them in a worker
+# thread so they do not block the event loop.
+TgReply = Union[str, Tuple[str, Optional[str]]]
+
+
+def _tg_cmd_add(cmd: str, today: date, week_start: date) -> TgReply:
+    try:
+        payload2 = _parse_add(cmd)
+        recipe = _db_add_recipe("dennis", payload2)
+        return f"✅ Gespeichert: {recipe.title}"
+    except Exception as e:
+        return (
+            "❌ Konnte nicht speichern: "
+            + str(e)
+            + "\nBeispiel:\nadd Spaghetti Carbonara | tags=pasta,italien | time=15 | diff=1"
+        )
+
+
+def _recipe_meta_suffix(time_minutes: Optional[int], difficulty: Optional[int], tags: Optional[List[str]]) -> str:
+    if not (time_minutes or difficulty or tags):
+        return ""
+    meta = []
+    if time_minutes:
+        meta.append(f"{time_minutes}min")
+    if difficulty:
+        meta.append(f"diff {difficulty}")
+    if tags:
+        meta.append(",".join(tags))
+    return f" ({' · '.join(meta)})"
+
+
+def _tg_cmd_list(cmd: str, today: date, week_start: date) -> TgReply:
+    try:
+        items = _db_list_recipes(limit=10)
+        if not items:
+            return "Noch keine Rezepte gespeichert. Beispiel:\nadd Spaghetti Carbonara | time=15 | diff=1"
+        body = "\n".join(
+            f"{i}) {r.title}{_recipe_meta_suffix(r.time_minutes, r.difficulty, r.tags)}"
+            for i, r in enumerate(items, start=1)
+        )
+        return "📚 Letzte Rezepte:\n" + body
+    except Exception as e:
+        return f"❌ Fehler bei list: {e}"
+
+
+def _tg_cmd_shop(cmd: str, today: date, week_start: date) -> TgReply:
+    base = _db_get_weekly_plan(week_start)
+    if not base:
+        return "Kein Plan vorhanden. Erst `plan` ausführen."
+
+    shop_settings = _get_settings_shop()
+    shop_payload = _cached_shop_payload(
+        shop_settings.get("shop_output_mode"),
+        base["days"],
+        _get_settings_pantry(),
+    )
+    telegram_message = shop_payload.get("telegram_message") or shop_payload["message"]
+    telegram_parse_mode = shop_payload.get("telegram_parse_mode")
+    return telegram_message, telegram_parse_mode
+
+
+def _tg_cmd_plan(cmd: str, today: date, week_start: date) -> TgReply:
+    # build or overwrite plan for current week
+    days = _build_new_week_plan()
+    _db_upsert_weekly_plan(week_start, days)
+    return _format_plan(days)
+
+
+def _tg_cmd_swap(cmd: str, today: date, week_start: date) -> TgReply:
+    try:
+        swap_days = _parse_swap_days(cmd)
+        result = _run_swap_preview(week_start, swap_days)
+        if not result.get("ok"):
+            return result.get("message") or "Swap nicht möglich."
+
+        draft = result.get("draft") or {}
+        return draft.get("message") or "Swap Vorschau erstellt."
+    except Exception as e:
+        return f"❌ swap Fehler: {e}\nBeispiel: swap 2 5 7 oder swap di fr so"
+
+
+def _tg_cmd_confirm(cmd: str, today: date, week_start: date) -> TgReply:
+    proposed = _apply_weekly_draft(week_start)
+    if proposed is None:
+        return "Kein Draft vorhanden. Nutze erst `swap ...`."
+
+    return "✅ Übernommen.\n\n" + _format_plan(proposed)
+
+
+def _tg_cmd_cancel(cmd: str, today: date, week_start: date) -> TgReply:
+    _discard_weekly_draft(week_start)
+    return "🗑️ Draft verworfen."
+
+
+def _tg_cmd_today(cmd: str, today: date, week_start: date) -> TgReply:
+    base = _db_get_weekly_plan(week_start)
+    if not base:
+        return "Kein Plan vorhanden. Erst `plan` ausführen."
+    day_num = today.isoweekday()  # 1=Mo 7=So
+    rid = base["days"].get(str(day_num))
+    title = _resolve_day_title(rid)
+    label = DAY_LABELS.get(day_num, "Heute")
+    tomorrow_num = (day_num % 7) + 1
+    rid_tomorrow = base["days"].get(str(tomorrow_num))
+    title_tomorrow = _resolve_day_title(rid_tomorrow)
+    label_tomorrow = DAY_LABELS.get(tomorrow_num, "Morgen")
+    return f"🍳 {label}: {title}\n🗓️ {label_tomorrow}: {title_tomorrow}"
+
+
+def _tg_cmd_note(cmd: str, today: date, week_start: date) -> TgReply:
+    text_content = _TG_NOTE_PREFIX_RE.sub("", cmd, count=1).strip()
+    if text_content and engine:
+        with Session(engine) as session:
+            note = PinboardNote(content=text_content, author_name="Telegram")
+            session.add(note)
+            session.commit()
+        return f"📌 Notiz gespeichert: {text_content}"
+    return "Beispiel: notiz Schulausflug Freitag!"
+
+
+def _tg_cmd_task(cmd: str, today: date, week_start: date) -> TgReply:
+    title_text = _TG_TASK_PREFIX_RE.sub("", cmd, count=1).strip()
+    if title_text and engine:
+        with Session(engine) as session:
+            chore = ChoreTask(title=title_text)
+            session.add(chore)
+            session.commit()
+        return f"✅ Aufgabe erstellt: {title_text}"
+    return "Beispiel: aufgabe Bad putzen"
+
+
+def _tg_cmd_status(cmd: str, today: date, week_start: date) -> TgReply:
+    lines = ["📊 Family Ops Status"]
+    # plan
+    base = _db_get_weekly_plan(week_start)
+    if base:
+        day_num = today.isoweekday()
+        rid = base["days"].get(str(day_num))
+        lines.append(f"🍳 Heute: {_resolve_day_title(rid)}")
+    else:
+        lines.append("📅 Kein Wochenplan vorhanden")
+    # open chores
+    if engine:
+        try:
+            with Session(engine) as session:
+                chores = list(session.exec(select(ChoreTask).where(ChoreTask.is_active == True)).all())  # noqa
+                if chores:
+                    lines.append(f"📋 Offene Aufgaben: {len(chores)}")
+        except Exception:
+            pass
+        # upcoming birthdays (next 14 days)
+        try:
+            with Session(engine) as session:
+                all_bdays = list(session.exec(select(Birthday)).all())
+                upcoming = []
+                for b in all_bdays:
+                    bday_this_year = birthday_for_year(b.birth_date, today.year)
+                    if bday_this_year < today:
+                        bday_this_year = birthday_for_year(b.birth_date, today.year + 1)
+                    diff = (bday_this_year - today).days
+                    if 0 <= diff <= 14:
+                        upcoming.append((diff, b.name))
+                if upcoming:
+                    upcoming.sort()
+                    for diff, name in upcoming[:3]:
+                        if diff == 0:
+                            lines.append(f"🎂 Heute: {name} hat Geburtstag!")
+                        else:
+                            lines.append(f"🎂 In {diff} Tagen: {name}")
+        except Exception:
+            pass
+    return "\n".join(lines)
+
+
+def _tg_cmd_birthdays(cmd: str, today: date, week_start: date) -> TgReply:
+    if not engine:
+        return "DB nicht verfügbar."
+    with Session(engine) as session:
+        all_bdays = list(session.exec(select(Birthday)).all())
+    if not all_bdays:
+        return "Keine Geburtstage gespeichert."
+    lines = ["🎂 Geburtstage (nächste 30 Tage):"]
+    upcoming = []
+    for b in all_bdays:
+        bday_this_year = birthday_for_year(b.birth_date, today.year)
+        if bday_this_year < today:
+            bday_this_year = birthday_for_year(b.birth_date, today.year + 1)
+        diff = (bday_this_year - today).days
+        if diff <= 30:
+            upcoming.append((diff, b.name, bday_this_year.strftime("%d.%m.")))
+    upcoming.sort()
+    if upcoming:
+        for diff, name, date_str in upcoming:
+            if diff == 0:
+                lines.append(f"🎉 Heute: {name}!")
+            else:
+                lines.append(f"In {diff} Tagen ({date_str}): {name}")
+    else:
+        lines.append("Keine Geburtstage in den nächsten 30 Tagen.")
+    return "\n".join(lines)
+
+
+_TG_MENU_COMMANDS: Dict[str, Callable[[int], Awaitable[None]]] = {
+    **dict.fromkeys(("/start", "/menu", "menu", "hilfe", "/hilfe"), _tg_show_main_menu),
+    **dict.fromkeys(("finanzen", "/finanzen"), _tg_show_finance_menu),
+}
+
+_TG_EXACT_COMMANDS: Dict[str, Callable[[str, date, date], TgReply]] = {
+    "list": _tg_cmd_list,
+    **dict.fromkeys(("shop", "einkauf"), _tg_cmd_shop),
+    "plan": _tg_cmd_plan,
+    "confirm": _tg_cmd_confirm,
+    "cancel": _tg_cmd_cancel,
+    **dict.fromkeys(("was", "heute", "/was"), _tg_cmd_today),
+    **dict.fromkeys(("status", "/status"), _tg_cmd_status),
+    **dict.fromkeys(("geburtstag", "geburtstage", "/geburtstag"), _tg_cmd_birthdays),
+}
+
+# Commands with arguments, keyed by the first whitespace-separated word ("aufgabe Müll" -> "aufgabe").
+_TG_VERB_COMMANDS: Dict[str, Callable[[str, date, date], TgReply]] = {
+    "add": _tg_cmd_add,
+    **dict.fromkeys(("notiz", "/notiz"), _tg_cmd_note),
+    **dict.fromkeys(("aufgabe", "/aufgabe"), _tg_cmd_task),
+}
+
+# Commands matched on the raw prefix, so bare or glued forms ("swap", "swap2") still
+# reach the handler and get its usage error.
+_TG_PREFIX_COMMANDS: Dict[str, Callable[[str, date, date], TgReply]] = {
+    "swap": _tg_cmd_swap,
+}
+
+
 # -----------------------------
 # Telegram webhook
 # -----------------------------
@@ -5690,7 +6119,8 @@ async def telegram_webhook(request: Request):
     if engine is None:
         raise HTTPException(status_code=500, detail="DATABASE_URL missing")
 
-    payload = await request.json()
+    body = await request.body()
+    payload = json_utils.loads(body)
     callback = payload.get("callback_query")
     msg = payload.get("message") or payload.get("edited_message") or (callback or {}).get("message")
     if not msg and not callback:
@@ -5703,15 +6133,14 @@ async def telegram_webhook(request: Request):
     callback_data = (callback or {}).get("data", "") or ""
     callback_id = (callback or {}).get("id")
 
-    print("TELEGRAM UPDATE:\n" + json.dumps(payload, ensure_ascii=False, indent=2), flush=True)
+    if TELEGRAM_DEBUG:
+        # log the raw body as received; no need to serialize the parsed payload again
+        print("TELEGRAM UPDATE: " + body.decode("utf-8", "replace"), flush=True)
 
     if from_id is None or chat_id is None:
         return {"ok": True}
 
-    try:
-        _db_set_app_state_value(APP_STATE_TELEGRAM_LAST_CHAT_ID, str(chat_id))
-    except Exception:
-        pass
+    await asyncio.to_thread(_remember_telegram_chat, chat_id)
 
     if not _is_allowed(int(from_id)):
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -5727,237 +6156,31 @@ async def telegram_webhook(request: Request):
     if await _tg_handle_flow_message(chat_id, cmd):
         return {"ok": True}
 
-    if cmd.lower() in {"/start", "/menu", "menu", "hilfe", "/hilfe"}:
-        await _tg_show_main_menu(chat_id)
+    cmd_lower = cmd.lower()
+    menu_handler = _TG_MENU_COMMANDS.get(cmd_lower)
+    if menu_handler is not None:
+        await menu_handler(chat_id)
         return {"ok": True}
 
-    if cmd.lower() in {"finanzen", "/finanzen"}:
-        await _tg_show_finance_menu(chat_id)
-        return {"ok": True}
-
-    # --- add ---
-    if cmd.lower().startswith("add "):
-        try:
-            payload2 = _parse_add(cmd)
-            recipe = _db_add_recipe("dennis", payload2)
-            await _tg_send(chat_id, f"✅ Gespeichert: {recipe.title}")
-        except Exception as e:
-            await _tg_send(
-                chat_id,
-                "❌ Konnte nicht speichern: "
-                + str(e)
-                + "\nBeispiel:\nadd Spaghetti Carbonara | tags=pasta,italien | time=15 | diff=1"
-            )
-        return {"ok": True}
-
-    # --- list ---
-    if cmd.lower() == "list":
-        try:
-            items = _db_list_recipes(limit=10)
-            if not items:
-                await _tg_send(chat_id, "Noch keine Rezepte gespeichert. Beispiel:\nadd Spaghetti Carbonara | time=15 | diff=1")
-            else:
-                lines = []
-                for i, r in enumerate(items, start=1):
-                    meta = []
-                    if r.time_minutes:
-                        meta.append(f"{r.time_minutes}min")
-                    if r.difficulty:
-                        meta.append(f"diff {r.difficulty}")
-                    if r.tags:
-                        meta.append(",".join(r.tags))
-                    suffix = f" ({' · '.join(meta)})" if meta else ""
-                    lines.append(f"{i}) {r.title}{suffix}")
-                await _tg_send(chat_id, "📚 Letzte Rezepte:\n" + "\n".join(lines))
-        except Exception as e:
-            await _tg_send(chat_id, f"❌ Fehler bei list: {e}")
-        return {"ok": True}
-
-    #--- shop ---
-    if cmd.lower() in {"shop", "einkauf"}:
-        base = _db_get_weekly_plan(week_start)
-        if not base:
-            await _tg_send(chat_id, "Kein Plan vorhanden. Erst `plan` ausführen.")
-            return {"ok": True}
-
-        shop_settings = _get_settings_shop()
-        shop_payload = build_shop_payload(
-            shop_settings.get("shop_output_mode"),
-            base["days"],
-            engine,
-            _get_settings_pantry(),
+    handler = _TG_EXACT_COMMANDS.get(cmd_lower)
+    if handler is None:
+        parts = cmd_lower.split(None, 1)
+        if len(parts) == 2:
+            handler = _TG_VERB_COMMANDS.get(parts[0])
+    if handler is None:
+        handler = next(
+            (prefix_handler for prefix, prefix_handler in _TG_PREFIX_COMMANDS.items() if cmd_lower.startswith(prefix)),
+            None,
         )
-        telegram_message = shop_payload.get("telegram_message") or shop_payload["message"]
-        telegram_parse_mode = shop_payload.get("telegram_parse_mode")
-        await _tg_send(chat_id, telegram_message, telegram_parse_mode)
-        return {"ok": True}
-
-
-
-    # --- plan ---
-    if cmd.lower() == "plan":
-        # build or overwrite plan for current week
-        days = _build_new_week_plan()
-        _db_upsert_weekly_plan(week_start, days)
-        await _tg_send(chat_id, _format_plan(days))
-        return {"ok": True}
-
-    # --- swap ---
-    if cmd.lower().startswith("swap"):
-        try:
-            swap_days = _parse_swap_days(cmd)
-            result = _run_swap_preview(week_start, swap_days)
-            if not result.get("ok"):
-                await _tg_send(chat_id, result.get("message") or "Swap nicht möglich.")
-                return {"ok": True}
-
-            draft = result.get("draft") or {}
-            await _tg_send(chat_id, draft.get("message") or "Swap Vorschau erstellt.")
-        except Exception as e:
-            await _tg_send(chat_id, f"❌ swap Fehler: {e}\nBeispiel: swap 2 5 7 oder swap di fr so")
-        return {"ok": True}
-
-    # --- confirm ---
-    if cmd.lower() == "confirm":
-        d = _db_get_draft(week_start)
-        if not d:
-            await _tg_send(chat_id, "Kein Draft vorhanden. Nutze erst `swap ...`.")
-            return {"ok": True}
-
-        proposed = d["proposed_days"]
-        _db_upsert_weekly_plan(week_start, proposed)
-        _db_delete_draft(week_start)
-        _clear_swap_avoid_list(week_start)
-        await _tg_send(chat_id, "✅ Übernommen.\n\n" + _format_plan(proposed))
-        return {"ok": True}
-
-    # --- cancel ---
-    if cmd.lower() == "cancel":
-        _db_delete_draft(week_start)
-        _clear_swap_avoid_list(week_start)
-        await _tg_send(chat_id, "🗑️ Draft verworfen.")
-        return {"ok": True}
-
-    # --- was ---
-    if cmd.lower() in {"was", "heute", "/was"}:
-        base = _db_get_weekly_plan(week_start)
-        if not base:
-            await _tg_send(chat_id, "Kein Plan vorhanden. Erst `plan` ausführen.")
-            return {"ok": True}
-        day_num = today.isoweekday()  # 1=Mo 7=So
-        rid = base["days"].get(str(day_num))
-        title = _resolve_day_title(rid)
-        label = DAY_LABELS.get(day_num, "Heute")
-        tomorrow_num = (day_num % 7) + 1
-        rid_tomorrow = base["days"].get(str(tomorrow_num))
-        title_tomorrow = _resolve_day_title(rid_tomorrow)
-        label_tomorrow = DAY_LABELS.get(tomorrow_num, "Morgen")
-        await _tg_send(chat_id, f"🍳 {label}: {title}\n🗓️ {label_tomorrow}: {title_tomorrow}")
-        return {"ok": True}
-
-    # --- notiz ---
-    if cmd.lower().startswith("notiz ") or cmd.lower().startswith("/notiz "):
-        text_content = re.sub(r"^/?notiz\s+", "", cmd, flags=re.IGNORECASE).strip()
-        if text_content and engine:
-            with Session(engine) as session:
-                note = PinboardNote(content=text_content, author_name="Telegram")
-                session.add(note)
-                session.commit()
-            await _tg_send(chat_id, f"📌 Notiz gespeichert: {text_content}")
-        else:
-            await _tg_send(chat_id, "Beispiel: notiz Schulausflug Freitag!")
-        return {"ok": True}
-
-    # --- aufgabe ---
-    if cmd.lower().startswith("aufgabe ") or cmd.lower().startswith("/aufgabe "):
-        title_text = re.sub(r"^/?aufgabe\s+", "", cmd, flags=re.IGNORECASE).strip()
-        if title_text and engine:
-            with Session(engine) as session:
-                chore = ChoreTask(title=title_text)
-                session.add(chore)
-                session.commit()
-            await _tg_send(chat_id, f"✅ Aufgabe erstellt: {title_text}")
-        else:
-            await _tg_send(chat_id, "Beispiel: aufgabe Bad putzen")
-        return {"ok": True}
-
-    # --- status ---
-    if cmd.lower() in {"status", "/status"}:
-        lines = ["📊 Family Ops Status"]
-        # plan
-        base = _db_get_weekly_plan(week_start)
-        if base:
-            day_num = today.isoweekday()
-            rid = base["days"].get(str(day_num))
-            lines.append(f"🍳 Heute: {_resolve_day_title(rid)}")
-        else:
-            lines.append("📅 Kein Wochenplan vorhanden")
-        # open chores
-        if engine:
-            try:
-                with Session(engine) as session:
-                    chores = list(session.exec(select(ChoreTask).where(ChoreTask.is_active == True)).all())  # noqa
-                    if chores:
-                        lines.append(f"📋 Offene Aufgaben: {len(chores)}")
-            except Exception:
-                pass
-            # upcoming birthdays (next 14 days)
-            try:
-                with Session(engine) as session:
-                    all_bdays = list(session.exec(select(Birthday)).all())
-                    upcoming = []
-                    for b in all_bdays:
-                        bday_this_year = birthday_for_year(b.birth_date, today.year)
-                        if bday_this_year < today:
-                            bday_this_year = birthday_for_year(b.birth_date, today.year + 1)
-                        diff = (bday_this_year - today).days
-                        if 0 <= diff <= 14:
-                            upcoming.append((diff, b.name))
-                    if upcoming:
-                        upcoming.sort()
-                        for diff, name in upcoming[:3]:
-                            if diff == 0:
-                                lines.append(f"🎂 Heute: {name} hat Geburtstag!")
-                            else:
-                                lines.append(f"🎂 In {diff} Tagen: {name}")
-            except Exception:
-                pass
-        await _tg_send(chat_id, "\n".join(lines))
-        return {"ok": True}
-
-    # --- geburtstag ---
-    if cmd.lower() in {"geburtstag", "geburtstage", "/geburtstag"}:
-        if not engine:
-            await _tg_send(chat_id, "DB nicht verfügbar.")
-            return {"ok": True}
-        with Session(engine) as session:
-            all_bdays = list(session.exec(select(Birthday)).all())
-        if not all_bdays:
-            await _tg_send(chat_id, "Keine Geburtstage gespeichert.")
-            return {"ok": True}
-        lines = ["🎂 Geburtstage (nächste 30 Tage):"]
-        upcoming = []
-        for b in all_bdays:
-            bday_this_year = birthday_for_year(b.birth_date, today.year)
-            if bday_this_year < today:
-                bday_this_year = birthday_for_year(b.birth_date, today.year + 1)
-            diff = (bday_this_year - today).days
-            if diff <= 30:
-                upcoming.append((diff, b.name, bday_this_year.strftime("%d.%m.")))
-        upcoming.sort()
-        if upcoming:
-            for diff, name, date_str in upcoming:
-                if diff == 0:
-                    lines.append(f"🎉 Heute: {name}!")
-                else:
-                    lines.append(f"In {diff} Tagen ({date_str}): {name}")
-        else:
-            lines.append("Keine Geburtstage in den nächsten 30 Tagen.")
-        await _tg_send(chat_id, "\n".join(lines))
+    if handler is not None:
+        reply = await asyncio.to_thread(handler, cmd, today, week_start)
+        text_msg, parse_mode = (reply, None) if isinstance(reply, str) else reply
+        _spawn_tg(chat_id, text_msg, parse_mode)
         return {"ok": True}
 
     # default
-    print(f"ALLOWED USER {from_id} SENT: {message_text}", flush=True)
+    if TELEGRAM_DEBUG:
+        print(f"ALLOWED USER {from_id} SENT: {message_text}", flush=True)
     help_text = (
         "Befehle:\n"
         "menu — mobiles Hauptmenü\n"
@@ -6217,7 +6440,7 @@ def api_get_chore_settings():
 def api_put_chore_settings(payload: ChoreSettingsPayload):
     max_points = max(1, min(10, payload.max_points))
     data = {"max_points": max_points}
-    _db_set_app_state_value(APP_STATE_CHORE_SETTINGS, json.dumps(data))
+    _db_set_app_state_value(APP_STATE_CHORE_SETTINGS, json_utils.dumps(data))
     return {"ok": True, "settings": data}
 
 
@@ -6245,7 +6468,7 @@ def api_put_pinboard_categories(payload: PinboardCategoriesPayload):
         for c in payload.categories
         if c.get("id") and c.get("label")
     ]
-    _db_set_app_state_value(APP_STATE_PINBOARD_CATEGORIES, json.dumps(cleaned, ensure_ascii=False))
+    _db_set_app_state_value(APP_STATE_PINBOARD_CATEGORIES, json_utils.dumps(cleaned))
     return {"ok": True, "categories": cleaned}
 
 
@@ -6580,6 +6803,7 @@ def api_create_meal_history(payload: MealHistoryCreate):
             pass
         session.commit()
         session.refresh(entry)
+    _invalidate_day_recipe(recipe_uuid)
     return {"ok": True, "id": str(entry.id)}
 
 
@@ -6686,6 +6910,7 @@ def api_rate_recipe(recipe_id: UUID, payload: RecipeRatingPayload):
         session.add(r)
         session.commit()
         session.refresh(r)
+        _invalidate_day_recipe(r.id)
     return {"ok": True, "rating": int(r.rating) if r.rating is not None else None, "cooked_count": r.cooked_count}
 
 
@@ -6697,21 +6922,20 @@ class CookAssignmentPayload(BaseModel):
     assignments: Dict[str, str]  # {"1": "member-uuid", "3": "member-uuid"}
 
 
+_SQL_SET_ASSIGNED_COOKS = sql_text("""
+    UPDATE public.weekly_plans
+    SET assigned_cooks = :cooks, updated_at = now()
+    WHERE week_start_date = :ws
+""").bindparams(bindparam("cooks", type_=JSONB))
+
+
 @app.put("/api/weekly/assign-cooks")
 def api_assign_cooks(payload: CookAssignmentPayload):
     if engine is None:
         raise HTTPException(500, "DATABASE_URL missing")
     week_start = _current_week_start()
-    with engine.connect() as conn:
-        conn.execute(
-            sql_text("""
-                UPDATE public.weekly_plans
-                SET assigned_cooks = (:cooks)::jsonb, updated_at = now()
-                WHERE week_start_date = :ws
-            """),
-            {"cooks": json.dumps(payload.assignments), "ws": week_start.isoformat()},
-        )
-        conn.commit()
+    with engine.begin() as conn:
+        conn.execute(_SQL_SET_ASSIGNED_COOKS, {"cooks": payload.assignments, "ws": week_start})
     return {"ok": True, "assigned_cooks": payload.assignments}
 
 
@@ -1,7 +1,7 @@
 from typing import Optional, List, Any, Dict
 from uuid import UUID
 from sqlmodel import SQLModel, Field
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from sqlalchemy import Column, text, DateTime, func, Text, Integer, Numeric, Boolean, Date, ForeignKey, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID, ARRAY, JSONB
 from sqlalchemy import String
@@ -29,7 +29,7 @@ class Recipe(SQLModel, table=True):
     difficulty: Optional[int] = None  # 1..3
     is_active: bool = True
     created_by: str = "dennis"
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     # Premium fields
     servings: Optional[int] = Field(default=4)
     rating: Optional[float] = Field(default=None, sa_column=Column(Numeric(2, 1), nullable=True))
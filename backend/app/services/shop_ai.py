@@ -1,32 +1,20 @@
-import json
 import os
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app import json_utils
+from app.ai_utils import parse_response_json
 
 _SPLIT_SEPARATORS_RE = re.compile(r"\s*[;,]\s*")
 _AND_SPLIT_RE = re.compile(r"\s+(?:und|&|\+)\s+", flags=re.IGNORECASE)
-_QUANTITY_HINT_RE = re.compile(
-    r"(?<!\w)(\d+[.,]?\d*|ein|eine|einen|einer|zwei|drei|vier|fuenf|fünf|sechs|sieben|acht|neun|zehn)\b",
-    flags=re.IGNORECASE,
-)
-_LEADING_AMOUNT_RE = re.compile(
-    r"^\s*(?P<num>\d+[.,]?\d*|ein|eine|einen|einer|zwei|drei|vier|fuenf|fünf|sechs|sieben|acht|neun|zehn)\s*(?P<rest>.+)$",
-    flags=re.IGNORECASE,
-)
 _CALC_STYLE_RE = re.compile(r"\d\s*[\+\=\*\/-]\s*\d")
-_UNIT_CANON = {
-    "kg": "g",
-    "g": "g",
-    "gramm": "g",
-    "l": "ml",
-    "ml": "ml",
-    "cl": "ml",
-    "el": "el",
-    "tl": "tl",
-    "stk": "stueck",
-    "stueck": "stueck",
-    "stück": "stueck",
-}
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_NON_WORD_CHARS_RE = re.compile(r"[^a-z0-9\s-]+")
+_TOKEN_SPLIT_RE = re.compile(r"[\s-]+")
+_UMLAUT_TABLE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
 _UNIT_PARSE = {
     "kg": "kg",
     "g": "g",
@@ -40,15 +28,16 @@ _UNIT_PARSE = {
     "stueck": "stueck",
     "stück": "stueck",
 }
-_UNIT_FACTOR_TO_BASE = {
-    "kg": 1000.0,
-    "g": 1.0,
-    "gramm": 1.0,
-    "l": 1000.0,
-    "ml": 1.0,
-    "cl": 10.0,
+# Convertible units -> (base unit, factor to base). el/tl/stueck only sum with themselves.
+_UNIT_TO_BASE = {
+    "kg": ("g", 1000.0),
+    "g": ("g", 1.0),
+    "gramm": ("g", 1.0),
+    "l": ("ml", 1000.0),
+    "ml": ("ml", 1.0),
+    "cl": ("ml", 10.0),
 }
-_STOPWORDS = {
+_STOPWORDS = frozenset({
     "frisch",
     "frische",
     "frischer",
@@ -60,7 +49,7 @@ _STOPWORDS = {
     "fein",
     "gehackt",
     "gerieben",
-}
+})
 _TOKEN_ALIAS = {
     "knoblauchzehe": "knoblauch",
     "knoblauchzehen": "knoblauch",
@@ -90,86 +79,60 @@ _CATEGORY_KEYWORDS = [
     (3, ("milch", "kaese", "käse", "joghurt", "sahne", "butter", "ei")),
     (4, ("salz", "pfeffer", "curry", "paprikapulver", "zimt", "oregano", "basilikum", "chili", "essig", "senf")),
 ]
+# One alternation per category, checked in list order: a leftmost match across all
+# categories would rank "Tomaten mit Rind" by "tomat" instead of by "rind".
+_CATEGORY_PATTERNS = [
+    (rank, re.compile("|".join(map(re.escape, words)))) for rank, words in _CATEGORY_KEYWORDS
+]
 
 
-def _extract_output_text(response) -> Optional[str]:
-    output_text = getattr(response, "output_text", None)
-    if output_text:
-        return output_text
+AI_RESULT_CACHE_MAX_ENTRIES = 64
+# (locale, prepared input lines) -> validated AI output; only successful runs are stored
+_ai_result_cache: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[str, ...]]" = OrderedDict()
+_ai_result_cache_lock = threading.Lock()
 
-    output = getattr(response, "output", None) or []
-    for item in output:
-        content = getattr(item, "content", None)
-        if content is None and isinstance(item, dict):
-            content = item.get("content")
-        if not content:
-            continue
-        for chunk in content:
-            chunk_type = getattr(chunk, "type", None)
-            if chunk_type is None and isinstance(chunk, dict):
-                chunk_type = chunk.get("type")
-            if chunk_type != "output_text":
-                continue
-            candidate = getattr(chunk, "text", None)
-            if candidate is None and isinstance(chunk, dict):
-                candidate = chunk.get("text")
-            if candidate:
-                return candidate
-    return None
-
-
-def _extract_output_data(response) -> Optional[Any]:
-    parsed = getattr(response, "output_parsed", None)
-    if parsed is not None:
-        return parsed
-
-    output = getattr(response, "output", None) or []
-    for item in output:
-        content = getattr(item, "content", None)
-        if content is None and isinstance(item, dict):
-            content = item.get("content")
-        if not content:
-            continue
-        for chunk in content:
-            chunk_type = getattr(chunk, "type", None)
-            if chunk_type is None and isinstance(chunk, dict):
-                chunk_type = chunk.get("type")
-            if chunk_type not in {"output_json", "json"}:
-                continue
-            candidate = getattr(chunk, "json", None)
-            if candidate is None and isinstance(chunk, dict):
-                candidate = chunk.get("json")
-            if candidate is not None:
-                return candidate
-    return None
 
+def _cached_ai_result(key: Tuple[str, Tuple[str, ...]]) -> Optional[List[str]]:
+    with _ai_result_cache_lock:
+        cached = _ai_result_cache.get(key)
+        if cached is None:
+            return None
+        _ai_result_cache.move_to_end(key)
+    return list(cached)
 
-def _parse_response_data(response) -> Optional[dict]:
-    data = _extract_output_data(response)
-    if isinstance(data, dict):
-        return data
 
-    output_text = _extract_output_text(response)
-    if not output_text:
-        return None
+def _store_ai_result(key: Tuple[str, Tuple[str, ...]], lines: List[str]) -> None:
+    with _ai_result_cache_lock:
+        _ai_result_cache[key] = tuple(lines)
+        _ai_result_cache.move_to_end(key)
+        while len(_ai_result_cache) > AI_RESULT_CACHE_MAX_ENTRIES:
+            _ai_result_cache.popitem(last=False)
 
-    # Some models occasionally wrap JSON in fenced code blocks.
-    cleaned = output_text.strip()
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
 
-    try:
-        parsed = json.loads(cleaned)
-    except Exception:
-        return None
-    return parsed if isinstance(parsed, dict) else None
+# One client per timeout: keeps the HTTPS connection to the API pooled between
+# shop requests instead of a new TLS handshake per call. No retries on purpose;
+# a slow or failed call falls back to the pre-aggregated list.
+_openai_clients: Dict[Tuple[float, str], Any] = {}
+_openai_clients_lock = threading.Lock()
+
 
+def _shop_openai_client(timeout: float):
+    # Keyed by the API key too, so a rotated OPENAI_API_KEY gets a fresh client.
+    key = (timeout, os.getenv("OPENAI_API_KEY") or "")
+    with _openai_clients_lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            from openai import OpenAI
 
+            client = OpenAI(timeout=timeout).with_options(max_retries=0)
+            _openai_clients[key] = client
+    return client
+
+
+@lru_cache(maxsize=2048)
 def _normalize_key(value: str) -> str:
-    s = value.strip().lower()
-    s = s.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    s = re.sub(r"[^a-z0-9]+", "", s)
+    s = value.strip().lower().translate(_UMLAUT_TABLE)
+    s = _NON_ALNUM_RE.sub("", s)
     return s
 
 
@@ -182,11 +145,11 @@ def _title_word(word: str) -> str:
     return word[:1].upper() + word[1:] if word else word
 
 
+@lru_cache(maxsize=2048)
 def _clean_name_for_merge(name: str) -> str:
-    s = name.strip().lower()
-    s = s.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    s = re.sub(r"[^a-z0-9\s-]+", " ", s)
-    tokens = [t for t in re.split(r"[\s-]+", s) if t]
+    s = name.strip().lower().translate(_UMLAUT_TABLE)
+    s = _NON_WORD_CHARS_RE.sub(" ", s)
+    tokens = [t for t in _TOKEN_SPLIT_RE.split(s) if t]
     norm_tokens: List[str] = []
     for tok in tokens:
         tok = _TOKEN_ALIAS.get(tok, tok)
@@ -203,17 +166,28 @@ def _clean_name_for_merge(name: str) -> str:
 
 
 def _parse_leading_amount(line: str) -> Tuple[Optional[float], str]:
-    m = _LEADING_AMOUNT_RE.match(line.strip())
-    if not m:
-        return None, line.strip()
-    num_raw = (m.group("num") or "").strip().lower()
-    rest = (m.group("rest") or "").strip()
-    if num_raw in _NUMBER_WORDS:
-        return _NUMBER_WORDS[num_raw], rest
-    try:
-        return float(num_raw.replace(",", ".")), rest
-    except Exception:
-        return None, line.strip()
+    s = line.strip()
+    n = len(s)
+    if s[:1].isdecimal():
+        # "500g Mehl", "1,5 l Milch", "12. Eier": digits, optional decimal mark, digits.
+        i = 1
+        while i < n and s[i].isdecimal():
+            i += 1
+        if i < n and s[i] in ".,":
+            i += 1
+            while i < n and s[i].isdecimal():
+                i += 1
+        rest = s[i:].strip()
+        if not rest:
+            return None, s
+        return float(s[:i].replace(",", ".")), rest
+    # Number words only count as a whole word ("eine Zwiebel", not "Einkauf").
+    parts = s.split(None, 1)
+    if len(parts) == 2:
+        value = _NUMBER_WORDS.get(parts[0].lower())
+        if value is not None:
+            return value, parts[1].strip()
+    return None, s
 
 
 def _split_unit_name(rest: str) -> Tuple[str, str]:
@@ -235,41 +209,46 @@ def _format_amount(value: float) -> str:
     return f"{value:.1f}".rstrip("0").rstrip(".")
 
 
+@lru_cache(maxsize=2048)
 def _category_rank(name: str) -> int:
     ln = name.lower()
-    for rank, words in _CATEGORY_KEYWORDS:
-        if any(w in ln for w in words):
+    for rank, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(ln):
             return rank
     return 3
 
 
-def _pre_aggregate_lines(lines: List[str]) -> List[str]:
+def _pre_aggregate_lines(lines: Iterable[str]) -> List[str]:
     grouped: Dict[str, Dict[str, Any]] = {}
+    # Hot loop over every ingredient line: bind the lookups once.
+    grouped_get = grouped.get
+    unit_to_base_get = _UNIT_TO_BASE.get
     for line in lines:
+        line = line.strip()
         amount, rest = _parse_leading_amount(line)
         unit, name = _split_unit_name(rest)
         if not name:
             name = rest
+        name = name.strip()
         merge_key = _clean_name_for_merge(name)
         if not merge_key:
             merge_key = _normalize_key(name)
         if not merge_key:
             merge_key = _normalize_key(line)
-        entry = grouped.get(merge_key)
+        entry = grouped_get(merge_key)
         if not entry:
-            entry = {
-                "name": name.strip(),
+            grouped[merge_key] = {
+                "name": name,
                 "unit": unit,
                 "amount": amount,
-                "raw": [line.strip()],
+                "raw": [line],
                 "summable": amount is not None,
             }
-            grouped[merge_key] = entry
             continue
 
-        entry["raw"].append(line.strip())
-        if entry["name"] and len(name.strip()) < len(entry["name"]):
-            entry["name"] = name.strip()
+        entry["raw"].append(line)
+        if entry["name"] and len(name) < len(entry["name"]):
+            entry["name"] = name
 
         if amount is None or entry["amount"] is None:
             entry["summable"] = False
@@ -282,13 +261,11 @@ def _pre_aggregate_lines(lines: List[str]) -> List[str]:
             entry["amount"] += amount
             continue
 
-        base_current = _UNIT_CANON.get(current_unit, current_unit)
-        base_next = _UNIT_CANON.get(next_unit, next_unit)
-        if base_current in _UNIT_FACTOR_TO_BASE and base_next in _UNIT_FACTOR_TO_BASE:
-            current_in_base = entry["amount"] * _UNIT_FACTOR_TO_BASE.get(current_unit or base_current, 1.0)
-            next_in_base = amount * _UNIT_FACTOR_TO_BASE.get(next_unit or base_next, 1.0)
-            entry["amount"] = current_in_base + next_in_base
-            entry["unit"] = _UNIT_CANON.get(base_current, base_current)
+        current_base = unit_to_base_get(current_unit)
+        next_base = unit_to_base_get(next_unit)
+        if current_base and next_base and current_base[0] == next_base[0]:
+            entry["amount"] = entry["amount"] * current_base[1] + amount * next_base[1]
+            entry["unit"] = current_base[0]
         else:
             entry["summable"] = False
             entry["amount"] = None
@@ -311,20 +288,22 @@ def _pre_aggregate_lines(lines: List[str]) -> List[str]:
     return sorted(result, key=lambda x: (_category_rank(x), x.lower()))
 
 
-def _expand_compound_lines(lines: List[str]) -> List[str]:
-    expanded: List[str] = []
-    for line in lines:
-        base_parts = [p.strip() for p in _SPLIT_SEPARATORS_RE.split(line) if p and p.strip()]
-        for part in base_parts:
-            and_parts = [part]
-            # Split "A und B" so combined ingredient lines become separate entries.
-            if len(_QUANTITY_HINT_RE.findall(part)) >= 2 or _AND_SPLIT_RE.search(part):
-                and_parts = [p.strip() for p in _AND_SPLIT_RE.split(part) if p and p.strip()]
-            for item in and_parts:
-                cleaned = re.sub(r"\s+", " ", item).strip(" -")
+def _iter_compound_lines(lines: Iterable[Any]) -> Iterator[str]:
+    """Yield one cleaned ingredient per entry, splitting "A, B" and "A und B" lines."""
+    for raw in lines:
+        if not raw:
+            continue
+        line = str(raw).strip()
+        if not line:
+            continue
+        for part in _SPLIT_SEPARATORS_RE.split(line):
+            # Split "A und B" so combined ingredient lines become separate entries;
+            # a part without a conjunction comes back from split() unchanged.
+            for item in _AND_SPLIT_RE.split(part):
+                # split()/join collapses whitespace like \s+ -> " " without the regex engine.
+                cleaned = " ".join(item.split()).strip(" -")
                 if cleaned:
-                    expanded.append(cleaned)
-    return expanded
+                    yield cleaned
 
 
 def _validate_grouped_output(data: dict, cleaned_input: List[str]) -> Optional[List[str]]:
@@ -333,7 +312,8 @@ def _validate_grouped_output(data: dict, cleaned_input: List[str]) -> Optional[L
         return None
 
     input_count = len(cleaned_input)
-    seen_indexes = set()
+    # Source rows already claimed by a group, as a bitmask over input indexes.
+    seen_mask = 0
     seen_groups = set()
     output_lines: List[str] = []
 
@@ -353,16 +333,15 @@ def _validate_grouped_output(data: dict, cleaned_input: List[str]) -> Optional[L
         if not isinstance(source_indexes, list) or not source_indexes:
             continue
 
-        local_indexes = set()
+        local_mask = 0
         for idx in source_indexes:
             if not isinstance(idx, int):
                 continue
             if idx < 0 or idx >= input_count:
                 continue
-            if idx in local_indexes or idx in seen_indexes:
-                continue
-            local_indexes.add(idx)
-        if not local_indexes:
+            local_mask |= 1 << idx
+        local_mask &= ~seen_mask
+        if not local_mask:
             continue
 
         group_key = _normalize_key(canonical_name)
@@ -373,12 +352,12 @@ def _validate_grouped_output(data: dict, cleaned_input: List[str]) -> Optional[L
         if group_key in seen_groups:
             continue
         seen_groups.add(group_key)
-        seen_indexes.update(local_indexes)
+        seen_mask |= local_mask
         output_lines.append(merged_line.strip())
 
     # Never lose items: uncovered source rows are appended unchanged.
     for idx in range(input_count):
-        if idx in seen_indexes:
+        if seen_mask >> idx & 1:
             continue
         raw_line = cleaned_input[idx].strip()
         if raw_line:
@@ -399,17 +378,72 @@ def _validate_grouped_output(data: dict, cleaned_input: List[str]) -> Optional[L
     return deduped if deduped else None
 
 
+# Prompt and response schema are constant; built once instead of per call.
+_SHOP_AI_SYSTEM_TEXT = (
+    "Transformer fuer deutsche Einkaufslisten. "
+    "Fasse gleiche Zutaten robust zusammen (Tippfehler, Singular/Plural, Varianten). "
+    "Synonyme mergen: Knoblauchzehe=Knoblauch, Fischsoesse/Fischsose=Fischsauce, "
+    "Fruehlingszwiebel=Fruehlingszwiebeln. "
+    "Summiere Mengen wenn parsebar. "
+    "VERBOTEN in merged_line: '+', '=', '*', '/', Rechenausdruecke. "
+    "Keine neuen Zutaten, keine fehlenden Zutaten. "
+    "Jede Ausgabezeile genau eine Zutat. "
+    "Sortierung: Protein/Fleisch/Fisch/Tofu, dann Gemuese/Obst/Kraeuter, "
+    "dann Grundnahrung/Carbs, dann Milchprodukte, dann Gewuerze/Saucen/Kleinkram. "
+    "Jeder Input-Index genau einmal in source_indexes."
+)
+
+_SHOP_AI_RULES = {
+    "no_new_items": True,
+    "group_equivalents": True,
+    "normalize_typos_variants": True,
+    "sum_quantities": True,
+    "sort_by_impact": True,
+    "source_indexes_must_cover_all_once": True,
+}
+
+_SHOP_AI_SCHEMA = {
+    "type": "json_schema",
+    "name": "shop_list_transform",
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "properties": {
+            "groups": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "properties": {
+                        "canonical_name": {"type": "string"},
+                        "merged_line": {"type": "string"},
+                        "source_indexes": {
+                            "type": "array",
+                            "minItems": 1,
+                            "items": {"type": "integer", "minimum": 0},
+                        },
+                    },
+                    "required": ["canonical_name", "merged_line", "source_indexes"],
+                },
+            },
+        },
+        "required": ["groups"],
+    },
+    "strict": True,
+}
+
+
 def transform_shop_list(
     to_buy_lines: List[str],
     locale: str = "de",
 ) -> Tuple[Optional[List[str]], Optional[str]]:
-    raw_input = [str(x).strip() for x in (to_buy_lines or []) if x and str(x).strip()]
-    cleaned_input = _expand_compound_lines(raw_input)
+    # Returns (lines, note). A note means the AI step was skipped or failed and the
+    # lines, if any, are only the pre-aggregated input.
+    # Splitting and aggregation run as one pass; no intermediate list of expanded lines.
+    cleaned_input = _pre_aggregate_lines(_iter_compound_lines(to_buy_lines or []))
     if not cleaned_input:
         return [], None
-    prepared_input = _pre_aggregate_lines(cleaned_input)
-    if prepared_input:
-        cleaned_input = prepared_input
 
     # For very large lists, skip remote AI to keep response time predictable.
     max_ai_lines_raw = (os.getenv("OPENAI_SHOP_MAX_LINES") or "").strip()
@@ -417,99 +451,64 @@ def transform_shop_list(
     if len(cleaned_input) > max_ai_lines:
         return cleaned_input, "AI Sortierung übersprungen (große Liste)."
 
+    # Nothing left to merge or reorder for one or two lines; skip the remote round trip.
+    min_ai_lines_raw = (os.getenv("OPENAI_SHOP_MIN_LINES") or "").strip()
+    min_ai_lines = int(min_ai_lines_raw) if min_ai_lines_raw.isdigit() else 3
+    if len(cleaned_input) < min_ai_lines:
+        return cleaned_input, None
+
     if not os.getenv("OPENAI_API_KEY"):
         return None, "AI Sortierung nicht verfügbar."
 
-    try:
-        from openai import OpenAI
-    except Exception:
-        return cleaned_input, "AI Sortierung nicht verfügbar."
+    # Different plans often boil down to the same buy lines (swaps, pantry edits).
+    cache_key = (locale, tuple(cleaned_input))
+    cached = _cached_ai_result(cache_key)
+    if cached is not None:
+        return cached, None
 
     model = (os.getenv("OPENAI_MODEL", "gpt-4o-mini") or "gpt-4o-mini").strip()
     timeout_raw = (os.getenv("OPENAI_SHOP_TIMEOUT_SECONDS") or os.getenv("OPENAI_TIMEOUT_SECONDS") or "").strip()
     timeout = float(timeout_raw) if timeout_raw else 30.0
-    client = OpenAI(timeout=timeout).with_options(max_retries=0)
-
-    system_text = (
-        "Transformer fuer deutsche Einkaufslisten. "
-        "Fasse gleiche Zutaten robust zusammen (Tippfehler, Singular/Plural, Varianten). "
-        "Synonyme mergen: Knoblauchzehe=Knoblauch, Fischsoesse/Fischsose=Fischsauce, "
-        "Fruehlingszwiebel=Fruehlingszwiebeln. "
-        "Summiere Mengen wenn parsebar. "
-        "VERBOTEN in merged_line: '+', '=', '*', '/', Rechenausdruecke. "
-        "Keine neuen Zutaten, keine fehlenden Zutaten. "
-        "Jede Ausgabezeile genau eine Zutat. "
-        "Sortierung: Protein/Fleisch/Fisch/Tofu, dann Gemuese/Obst/Kraeuter, "
-        "dann Grundnahrung/Carbs, dann Milchprodukte, dann Gewuerze/Saucen/Kleinkram. "
-        "Jeder Input-Index genau einmal in source_indexes."
-    )
+    try:
+        client = _shop_openai_client(timeout)
+    except Exception:
+        return cleaned_input, "AI Sortierung nicht verfügbar."
 
     user_payload = {
         "locale": locale,
         "indexed_to_buy": [{"i": i, "line": line} for i, line in enumerate(cleaned_input)],
-        "rules": {
-            "no_new_items": True,
-            "group_equivalents": True,
-            "normalize_typos_variants": True,
-            "sum_quantities": True,
-            "sort_by_impact": True,
-            "source_indexes_must_cover_all_once": True,
-        },
-    }
-
-    schema = {
-        "type": "json_schema",
-        "name": "shop_list_transform",
-        "schema": {
-            "type": "object",
-            "additionalProperties": False,
-            "properties": {
-                "groups": {
-                    "type": "array",
-                    "minItems": 1,
-                    "items": {
-                        "type": "object",
-                        "additionalProperties": False,
-                        "properties": {
-                            "canonical_name": {"type": "string"},
-                            "merged_line": {"type": "string"},
-                            "source_indexes": {
-                                "type": "array",
-                                "minItems": 1,
-                                "items": {"type": "integer", "minimum": 0},
-                            },
-                        },
-                        "required": ["canonical_name", "merged_line", "source_indexes"],
-                    },
-                },
-            },
-            "required": ["groups"],
-        },
-        "strict": True,
+        "rules": _SHOP_AI_RULES,
     }
 
     try:
         max_tokens_raw = (os.getenv("OPENAI_SHOP_MAX_OUTPUT_TOKENS") or "").strip()
         max_tokens = int(max_tokens_raw) if max_tokens_raw.isdigit() else 1800
+        # One strict-schema group costs roughly 40-60 output tokens; the floor leaves room
+        # for short lists and for reasoning models that spend output tokens before answering.
+        max_tokens = min(max_tokens, max(1000, 200 + 60 * len(cleaned_input)))
         response = client.responses.create(
             model=model,
             input=[
-                {"role": "system", "content": [{"type": "input_text", "text": system_text}]},
+                {"role": "system", "content": [{"type": "input_text", "text": _SHOP_AI_SYSTEM_TEXT}]},
                 {
                     "role": "user",
                     "content": [
-                        {"type": "input_text", "text": json.dumps(user_payload, ensure_ascii=False)}
+                        {"type": "input_text", "text": json_utils.dumps(user_payload)}
                     ],
                 },
             ],
-            text={"format": schema},
+            text={"format": _SHOP_AI_SCHEMA},
             max_output_tokens=max_tokens,
             truncation="auto",
         )
     except Exception:
         return cleaned_input, "AI Sortierung nicht verfügbar."
 
-    data = _parse_response_data(response)
+    # A response cut off at max_output_tokens only carries part of the groups.
+    if getattr(response, "status", None) == "incomplete":
+        return cleaned_input, "AI Sortierung nicht verfügbar."
+
+    data = parse_response_json(response)
     if not isinstance(data, dict):
         return cleaned_input, "AI Sortierung nicht verfügbar."
 
@@ -518,13 +517,9 @@ def transform_shop_list(
         return cleaned_input, "AI Sortierung nicht verfügbar."
     if not cleaned_output and cleaned_input:
         return cleaned_input, "AI Sortierung nicht verfügbar."
+    _store_ai_result(cache_key, cleaned_output)
     return cleaned_output, None
 
 
 def prepare_shop_lines_for_snapshot(to_buy_lines: List[str]) -> List[str]:
-    raw_input = [str(x).strip() for x in (to_buy_lines or []) if x and str(x).strip()]
-    cleaned_input = _expand_compound_lines(raw_input)
-    if not cleaned_input:
-        return []
-    prepared_input = _pre_aggregate_lines(cleaned_input)
-    return prepared_input or cleaned_input
+    return _pre_aggregate_lines(_iter_compound_lines(to_buy_lines or []))
@@ -1,7 +1,9 @@
 from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
 from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 import html
-import re
 import unicodedata
 
 from sqlmodel import Session, select
@@ -12,9 +14,11 @@ from app.services.shop_ai import prepare_shop_lines_for_snapshot, transform_shop
 
 SHOP_OUTPUT_AI = "ai_consolidated"
 SHOP_OUTPUT_PER_RECIPE = "per_recipe"
-SHOP_OUTPUT_MODES = {SHOP_OUTPUT_AI, SHOP_OUTPUT_PER_RECIPE}
+SHOP_OUTPUT_MODES = frozenset({SHOP_OUTPUT_AI, SHOP_OUTPUT_PER_RECIPE})
 
-PUNCT_RE = re.compile(r"[.,;:!?()\[\]{}\"'`´/\\|]+")
+# Punctuation and hyphens become word breaks in normalize_ingredient. No "´": NFKD
+# accent stripping has already turned it into a space by the time the table applies.
+PUNCT_TABLE = str.maketrans(dict.fromkeys(".,;:!?()[]{}\"'`/\\|-", " "))
 PANTRY_STOPWORDS = {
     "frisch", "frische", "frischer", "frischen", "rote", "roten", "rot", "gelbe", "gelben",
     "weisse", "weissen", "weiß", "weiss", "klein", "kleine", "kleinen", "gross", "große",
@@ -27,15 +31,12 @@ def _strip_accents(value: str) -> str:
     return "".join(ch for ch in unicodedata.normalize("NFKD", value) if not unicodedata.combining(ch))
 
 
+# Pure and hot: every recipe ingredient is normalized against every pantry name/alias.
+@lru_cache(maxsize=4096)
 def normalize_ingredient(value: str) -> str:
     if not value:
         return ""
-    s = _strip_accents(value.strip().lower())
-    s = PUNCT_RE.sub(" ", s)
-    s = s.replace("-", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    if not s:
-        return ""
+    s = _strip_accents(value.strip().lower()).translate(PUNCT_TABLE)
 
     words: List[str] = []
     for raw_word in s.split():
@@ -58,20 +59,20 @@ def ingredient_tokens(value: str) -> List[str]:
 
 
 def clean_display_name(value: str) -> str:
-    s = value.strip()
-    s = re.sub(r"\s+", " ", s)
-    return s
+    # Same as stripping and collapsing \s+ runs to one space, without the regex engine.
+    return " ".join(value.split())
 
 
 def build_pantry_alias_map(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
     alias_map: Dict[str, Dict[str, Any]] = {}
+    normalize = normalize_ingredient
     for item in items:
         name = item.get("name", "")
         uncertain = bool(item.get("uncertain"))
-        aliases = item.get("aliases") or []
-        candidates = [name] + list(aliases)
-        for cand in candidates:
-            norm = normalize_ingredient(str(cand))
+        for cand in chain((name,), item.get("aliases") or ()):
+            if not isinstance(cand, str):
+                cand = str(cand)
+            norm = normalize(cand)
             if not norm:
                 continue
             existing = alias_map.get(norm)
@@ -81,18 +82,27 @@ def build_pantry_alias_map(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, A
                 alias_map[norm] = {
                     "name": name,
                     "uncertain": uncertain,
-                    "matched_value": str(cand).strip(),
-                    "match_type": "name" if str(cand).strip() == name else "alias",
+                    "matched_value": cand.strip(),
+                    "match_type": "name" if cand.strip() == name else "alias",
                 }
     return alias_map
 
 
-def match_pantry_item(raw_ingredient: str, pantry_items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def match_pantry_item(
+    raw_ingredient: str,
+    pantry_items: List[Dict[str, Any]],
+    alias_map: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Pantry entry covering raw_ingredient, if any.
+
+    Callers matching many ingredients should pass build_pantry_alias_map(pantry_items) once.
+    """
     raw_norm = normalize_ingredient(raw_ingredient)
     if not raw_norm:
         return None
 
-    alias_map = build_pantry_alias_map(pantry_items)
+    if alias_map is None:
+        alias_map = build_pantry_alias_map(pantry_items)
     exact = alias_map.get(raw_norm)
     if exact:
         return dict(exact)
@@ -143,21 +153,97 @@ def _to_list(counts: Dict[str, int], display_map: Optional[Dict[str, str]] = Non
     return sorted(items, key=lambda x: x["name"].lower())
 
 
-def _collect_recipe_ingredients(days: Dict[str, str], engine: Any) -> List[Tuple[str, str]]:
-    rows: List[Tuple[str, str]] = []
+def _format_counted(item: Dict[str, Any]) -> str:
+    cnt = item["count"]
+    return f"- {item['name']}  x{cnt}" if cnt > 1 else f"- {item['name']}"
+
+
+def _pantry_section_lines(
+    pantry_used_list: List[Dict[str, Any]],
+    pantry_uncertain_list: List[Dict[str, Any]],
+) -> List[str]:
+    lines: List[str] = []
+    if pantry_used_list:
+        lines.append("")
+        lines.append("Im Basisvorrat erkannt:")
+        lines.extend(_format_counted(item) for item in pantry_used_list)
+    if pantry_uncertain_list:
+        lines.append("")
+        lines.append("Basisvorrat bitte prüfen:")
+        lines.extend(_format_counted(item) for item in pantry_uncertain_list)
+    return lines
+
+
+def _load_plan_recipes(days: Dict[str, str], engine: Any) -> List[Any]:
+    """(id, title, ingredients) rows of the plan in day order (Mo..So), fetched with one IN query.
+
+    A recipe planned on two days appears twice, like the old per-day lookups.
+    """
+    day_ids: List[UUID] = []
+    for d in range(1, 8):
+        rid = days.get(str(d))
+        if not rid or (isinstance(rid, str) and rid.startswith("KI:")):
+            continue
+        try:
+            day_ids.append(UUID(str(rid)))
+        except ValueError:
+            continue
+    if not day_ids:
+        return []
     with Session(engine) as session:
-        for d in range(1, 8):
-            rid = days.get(str(d))
-            if not rid or (isinstance(rid, str) and rid.startswith("KI:")):
+        stmt = select(Recipe.id, Recipe.title, Recipe.ingredients).where(Recipe.id.in_(set(day_ids)))
+        found = {r.id: r for r in session.exec(stmt)}
+    return [found[rid] for rid in day_ids if rid in found]
+
+
+def _classify_plan_ingredients(
+    days: Dict[str, str],
+    engine: Any,
+    pantry_items: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Single pass over the plan: per recipe what is left to buy, plus what the pantry covers.
+
+    Both output modes project from this, so the pantry matching lives in one place.
+    """
+    per_recipe: List[Dict[str, Any]] = []
+    pantry_used_counts: Counter[str] = Counter()
+    pantry_uncertain_counts: Counter[str] = Counter()
+    pantry_matches: List[Dict[str, Any]] = []
+    alias_map = build_pantry_alias_map(pantry_items)
+
+    for recipe in _load_plan_recipes(days, engine):
+        to_buy: List[str] = []
+        for ing in (recipe.ingredients or []):
+            raw = clean_display_name(ing or "")
+            if not raw:
                 continue
-            recipe = session.get(Recipe, rid)
-            if not recipe:
+            pantry_entry = match_pantry_item(raw, pantry_items, alias_map)
+            if pantry_entry:
+                key = pantry_entry["name"]
+                if pantry_entry.get("uncertain"):
+                    pantry_uncertain_counts[key] += 1
+                else:
+                    pantry_used_counts[key] += 1
+                pantry_matches.append(
+                    {
+                        "content": raw,
+                        "recipe_title": recipe.title,
+                        "pantry_name": key,
+                        "uncertain": bool(pantry_entry.get("uncertain")),
+                        "matched_value": pantry_entry.get("matched_value") or key,
+                        "match_type": pantry_entry.get("match_type") or "name",
+                    }
+                )
                 continue
-            for ing in (recipe.ingredients or []):
-                raw = (ing or "").strip()
-                if raw:
-                    rows.append((clean_display_name(raw), recipe.title))
-    return rows
+            to_buy.append(raw)
+        per_recipe.append({"title": recipe.title, "ingredients": to_buy})
+
+    return {
+        "per_recipe": per_recipe,
+        "pantry_used": _to_list(pantry_used_counts),
+        "pantry_uncertain_used": _to_list(pantry_uncertain_counts),
+        "pantry_matches": pantry_matches,
+    }
 
 
 def aggregate_shop_items(
@@ -165,74 +251,39 @@ def aggregate_shop_items(
     engine: Any,
     pantry_items: List[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    buy_counts: Dict[str, int] = {}
+    classified = _classify_plan_ingredients(days, engine, pantry_items)
+    buy_counts: Counter[str] = Counter()
     buy_display: Dict[str, str] = {}
     buy_lines: List[str] = []
-    pantry_used_counts: Dict[str, int] = {}
-    pantry_uncertain_counts: Dict[str, int] = {}
-    pantry_matches: List[Dict[str, Any]] = []
 
-    for raw, recipe_title in _collect_recipe_ingredients(days, engine):
-        norm = normalize_ingredient(raw)
-        if not norm:
-            continue
-        pantry_entry = match_pantry_item(raw, pantry_items)
-        if pantry_entry:
-            key = pantry_entry["name"]
-            if pantry_entry.get("uncertain"):
-                pantry_uncertain_counts[key] = pantry_uncertain_counts.get(key, 0) + 1
-            else:
-                pantry_used_counts[key] = pantry_used_counts.get(key, 0) + 1
-            pantry_matches.append(
-                {
-                    "content": raw,
-                    "recipe_title": recipe_title,
-                    "pantry_name": key,
-                    "uncertain": bool(pantry_entry.get("uncertain")),
-                    "matched_value": pantry_entry.get("matched_value") or key,
-                    "match_type": pantry_entry.get("match_type") or "name",
-                }
-            )
-            continue
-
-        buy_lines.append(raw)
-        if norm not in buy_display:
-            buy_display[norm] = raw
-        buy_counts[norm] = buy_counts.get(norm, 0) + 1
+    for recipe in classified["per_recipe"]:
+        for raw in recipe["ingredients"]:
+            norm = normalize_ingredient(raw)
+            if not norm:
+                continue
+            buy_lines.append(raw)
+            buy_display.setdefault(norm, raw)
+            buy_counts[norm] += 1
 
     buy_list = _to_list(buy_counts, buy_display)
-    pantry_used_list = _to_list(pantry_used_counts)
-    pantry_uncertain_list = _to_list(pantry_uncertain_counts)
+    pantry_used_list = classified["pantry_used"]
+    pantry_uncertain_list = classified["pantry_uncertain_used"]
 
     message_lines: List[str] = []
     if not buy_list:
         message_lines.append("🧺 Einkaufsliste ist leer (oder alle Zutaten sind im Basisvorrat).")
     else:
         message_lines.append("🧺 Einkaufsliste (aggregiert):")
-        for item in buy_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
-
-    if pantry_used_list:
-        message_lines.append("")
-        message_lines.append("Im Basisvorrat erkannt:")
-        for item in pantry_used_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
+        message_lines.extend(_format_counted(item) for item in buy_list)
 
-    if pantry_uncertain_list:
-        message_lines.append("")
-        message_lines.append("Basisvorrat bitte prüfen:")
-        for item in pantry_uncertain_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
+    message_lines.extend(_pantry_section_lines(pantry_used_list, pantry_uncertain_list))
 
     return {
         "buy": buy_list,
         "buy_lines": buy_lines,
         "pantry_used": pantry_used_list,
         "pantry_uncertain_used": pantry_uncertain_list,
-        "pantry_matches": pantry_matches,
+        "pantry_matches": classified["pantry_matches"],
         "message": "\n".join(message_lines),
     }
 
@@ -251,19 +302,7 @@ def format_shop_message(
         for line in buy_lines:
             message_lines.append(f"- {line}")
 
-    if pantry_used_list:
-        message_lines.append("")
-        message_lines.append("Im Basisvorrat erkannt:")
-        for item in pantry_used_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
-
-    if pantry_uncertain_list:
-        message_lines.append("")
-        message_lines.append("Basisvorrat bitte prüfen:")
-        for item in pantry_uncertain_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
+    message_lines.extend(_pantry_section_lines(pantry_used_list, pantry_uncertain_list))
 
     if note:
         message_lines.append("")
@@ -285,12 +324,16 @@ def build_consolidated_output(
     warning = None
     ai_applied = False
     if ai_lines is not None:
-        ai_applied = True
+        # Lines with a note are the pre-aggregated fallback (AI skipped or failed); the
+        # warning keeps that payload out of the shop payload cache.
+        ai_applied = ai_note is None
+        warning = ai_note
         buy_items = [{"name": line, "count": 1} for line in ai_lines]
         message = format_shop_message(
             ai_lines,
             aggregated["pantry_used"],
             aggregated["pantry_uncertain_used"],
+            note=ai_note,
         )
     else:
         buy_items = aggregated["buy"]
@@ -318,47 +361,10 @@ def build_per_recipe_output(
     engine: Any,
     pantry_items: List[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    per_recipe: List[Dict[str, Any]] = []
-    pantry_used_counts: Dict[str, int] = {}
-    pantry_uncertain_counts: Dict[str, int] = {}
-    pantry_matches: List[Dict[str, Any]] = []
-
-    with Session(engine) as session:
-        for d in range(1, 8):
-            rid = days.get(str(d))
-            if not rid or (isinstance(rid, str) and rid.startswith("KI:")):
-                continue
-            recipe = session.get(Recipe, rid)
-            if not recipe:
-                continue
-            ingredients: List[str] = []
-            for ing in (recipe.ingredients or []):
-                raw = clean_display_name(ing or "")
-                if not raw:
-                    continue
-                pantry_entry = match_pantry_item(raw, pantry_items)
-                if pantry_entry:
-                    key = pantry_entry["name"]
-                    if pantry_entry.get("uncertain"):
-                        pantry_uncertain_counts[key] = pantry_uncertain_counts.get(key, 0) + 1
-                    else:
-                        pantry_used_counts[key] = pantry_used_counts.get(key, 0) + 1
-                    pantry_matches.append(
-                        {
-                            "content": raw,
-                            "recipe_title": recipe.title,
-                            "pantry_name": key,
-                            "uncertain": bool(pantry_entry.get("uncertain")),
-                            "matched_value": pantry_entry.get("matched_value") or key,
-                            "match_type": pantry_entry.get("match_type") or "name",
-                        }
-                    )
-                    continue
-                ingredients.append(raw)
-            per_recipe.append({"title": recipe.title, "ingredients": ingredients})
-
-    pantry_used_list = _to_list(pantry_used_counts)
-    pantry_uncertain_list = _to_list(pantry_uncertain_counts)
+    classified = _classify_plan_ingredients(days, engine, pantry_items)
+    per_recipe = classified["per_recipe"]
+    pantry_used_list = classified["pantry_used"]
+    pantry_uncertain_list = classified["pantry_uncertain_used"]
 
     message_lines: List[str] = ["🧾 Einkaufsliste (Pro Rezept)"]
     telegram_lines: List[str] = ["🧾 Einkaufsliste (Pro Rezept)"]
@@ -379,19 +385,7 @@ def build_per_recipe_output(
             message_lines.append("")
             telegram_lines.append("")
 
-    if pantry_used_list:
-        message_lines.append("")
-        message_lines.append("Im Basisvorrat erkannt:")
-        for item in pantry_used_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
-
-    if pantry_uncertain_list:
-        message_lines.append("")
-        message_lines.append("Basisvorrat bitte prüfen:")
-        for item in pantry_uncertain_list:
-            cnt = item["count"]
-            message_lines.append(f"- {item['name']}" + (f"  x{cnt}" if cnt > 1 else ""))
+    message_lines.extend(_pantry_section_lines(pantry_used_list, pantry_uncertain_list))
 
     return {
         "mode": SHOP_OUTPUT_PER_RECIPE,
@@ -399,7 +393,7 @@ def build_per_recipe_output(
         "per_recipe": per_recipe,
         "pantry_used": pantry_used_list,
         "pantry_uncertain_used": pantry_uncertain_list,
-        "pantry_matches": pantry_matches,
+        "pantry_matches": classified["pantry_matches"],
         "message": "\n".join(message_lines),
         "telegram_message": "\n".join(telegram_lines).strip(),
         "telegram_parse_mode": "HTML",
@@ -408,15 +402,21 @@ def build_per_recipe_output(
     }
 
 
+# Unknown or missing modes fall back to the consolidated list.
+_SHOP_OUTPUT_BUILDERS = {
+    SHOP_OUTPUT_AI: build_consolidated_output,
+    SHOP_OUTPUT_PER_RECIPE: build_per_recipe_output,
+}
+
+
 def build_shop_payload(
     mode: Optional[str],
     days: Dict[str, str],
     engine: Any,
     pantry_items: List[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    if mode == SHOP_OUTPUT_PER_RECIPE:
-        return build_per_recipe_output(days, engine, pantry_items)
-    return build_consolidated_output(days, engine, pantry_items)
+    builder = _SHOP_OUTPUT_BUILDERS.get(mode, build_consolidated_output)
+    return builder(days, engine, pantry_items)
 
 
 def suggest_pantry_aliases_from_ingredients(
@@ -446,7 +446,7 @@ def suggest_pantry_aliases_from_ingredients(
             continue
         if norm in alias_map:
             continue
-        match = match_pantry_item(clean, pantry_items)
+        match = match_pantry_item(clean, pantry_items, alias_map)
         if match and norm not in seen_aliases[match["name"]]:
             seen_aliases[match["name"]].add(norm)
             suggestion_map[match["name"]].append(
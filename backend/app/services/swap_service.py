@@ -1,15 +1,53 @@
-from datetime import datetime
-from typing import Dict, List, Optional, Set, Tuple
+import random
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
-from sqlalchemy import func
 from sqlmodel import Session, select
 
 from app.models import Recipe
 
+RECIPE_POOL_TTL_SECONDS = 60.0
+
+# (loaded_at, [(recipe_id, tags), ...]) for all active recipes
+_recipe_pool: Optional[Tuple[float, List[Tuple[str, FrozenSet[str]]]]] = None
+_recipe_pool_lock = threading.Lock()
+
+
+def _is_real_recipe_id(value) -> bool:
+    # Plan slots hold recipe ids or "KI: ..." placeholder titles.
+    return isinstance(value, str) and bool(value) and not value.startswith("KI:")
+
+
+def invalidate_recipe_pool() -> None:
+    """Drop the cached pool; call after recipes are created, archived or retagged."""
+    global _recipe_pool
+    with _recipe_pool_lock:
+        _recipe_pool = None
+
+
+def _active_recipe_pool(engine) -> List[Tuple[str, FrozenSet[str]]]:
+    global _recipe_pool
+    now = time.monotonic()
+    with _recipe_pool_lock:
+        cached = _recipe_pool
+    if cached is not None and now - cached[0] < RECIPE_POOL_TTL_SECONDS:
+        return cached[1]
+
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Recipe.id, Recipe.tags).where(Recipe.is_active == True)  # noqa: E712
+        ).all()
+    # Tags are frozen once per load so preference checks need no per-call set.
+    pool = [(str(rid), frozenset(tags or ())) for rid, tags in rows]
+    with _recipe_pool_lock:
+        _recipe_pool = (now, pool)
+    return pool
+
 
 def pick_recipes_for_days(
     engine,
-    existing_ids: List[str],
+    existing_ids: Iterable[str],
     count: int,
     prefer_tags: Optional[List[str]] = None,
     prefer_max: int = 0,
@@ -21,42 +59,37 @@ def pick_recipes_for_days(
     """
     if engine is None:
         raise RuntimeError("DATABASE_URL missing")
+    if count <= 0:
+        return [], []
 
     picked: List[str] = []
-    dummy: List[str] = []
 
-    with Session(engine) as session:
-        stmt = (
-            select(Recipe)
-            .where(Recipe.is_active == True)  # noqa: E712
-            .order_by(func.random())
-        )
-        all_recipes = list(session.exec(stmt))
-
-    available = [r for r in all_recipes if str(r.id) not in existing_ids]
+    # Draw from the cached pool instead of ORDER BY random() on every call.
+    # The pool already holds only (id, tags), so filtering here transfers nothing extra.
+    excluded = existing_ids if isinstance(existing_ids, (set, frozenset)) else set(existing_ids)
+    available = [entry for entry in _active_recipe_pool(engine) if entry[0] not in excluded]
 
     prefer_set = {t for t in (prefer_tags or []) if t}
-    preferred: List[Recipe] = []
-    if prefer_set:
-        for r in available:
-            if set(r.tags or []) & prefer_set:
-                preferred.append(r)
-
     if prefer_set and prefer_max > 0:
-        for r in preferred:
-            if len(picked) >= prefer_max:
+        random.shuffle(available)
+        # One pass: the first prefer_max tag matches are preferred picks, everything
+        # else (including later matches) queues as filler in shuffled order.
+        filler: List[str] = []
+        for rid, tags in available:
+            if len(picked) < prefer_max and not prefer_set.isdisjoint(tags):
+                picked.append(rid)
+            elif len(filler) < count:
+                filler.append(rid)
+            if len(picked) >= prefer_max and len(picked) + len(filler) >= count:
                 break
-            picked.append(str(r.id))
-
-    for r in available:
-        if len(picked) >= count:
-            break
-        if str(r.id) in picked:
-            continue
-        picked.append(str(r.id))
+        picked.extend(filler[: max(0, count - len(picked))])
+    else:
+        # Without tag preferences only `count` ids are needed: sample them, skip the full shuffle.
+        sample = random.sample(available, max(0, min(count, len(available))))
+        picked = [rid for rid, _tags in sample]
 
-    while len(picked) + len(dummy) < count:
-        dummy.append(f"KI: Neues Rezept {len(dummy)+1}")
+    missing = count - len(picked)
+    dummy = [f"KI: Neues Rezept {i}" for i in range(1, missing + 1)]
 
     return picked, dummy
 
@@ -66,12 +99,17 @@ def update_avoid_list_for_reroll(
     swap_days: List[int],
     avoid_ids: Set[str],
 ) -> Set[str]:
-    updated = set(avoid_ids)
-    for d in swap_days:
-        rid = current_days.get(str(d))
-        if rid and isinstance(rid, str) and not rid.startswith("KI:"):
-            updated.add(rid)
-    return updated
+    """Avoid set plus the real recipes currently on swap_days.
+
+    Returns avoid_ids itself (not a copy) when there is nothing new to add.
+    """
+    additions = {
+        rid for d in swap_days
+        if _is_real_recipe_id(rid := current_days.get(str(d))) and rid not in avoid_ids
+    }
+    if not additions:
+        return avoid_ids
+    return avoid_ids | additions
 
 
 def apply_swaps(
@@ -81,37 +119,34 @@ def apply_swaps(
     avoid_ids: Set[str],
 ) -> Dict[str, str]:
     current = dict(base_days)
+    if not swap_days:
+        return current
 
     # 1) Alles, was schon im Plan drin ist (echte Rezepte), ist "verboten"
-    banned_ids = {
-        v for v in current.values()
-        if v and isinstance(v, str) and not v.startswith("KI:")
-    }
+    banned_ids = {v for v in current.values() if _is_real_recipe_id(v)}
     banned_ids.update(avoid_ids)
 
-    # 2) Für die Swap-Slots löschen wir erst mal die Einträge
-    for d in swap_days:
-        current[str(d)] = ""
-
-    # 3) Jetzt picken wir neue Rezepte, die NICHT in banned_ids sind
+    # 2) Jetzt picken wir neue Rezepte, die NICHT in banned_ids sind
     picked_ids, dummy_titles = pick_recipes_for_days(
         engine,
-        existing_ids=list(banned_ids),
+        existing_ids=banned_ids,
         count=len(swap_days),
     )
 
-    # 4) Und verteilen sie auf die Swap-Tage
+    # 3) Und verteilen sie auf die Swap-Tage (jeder Swap-Tag wird hier neu belegt)
     pi = 0
     di = 0
-    stamp = datetime.utcnow().strftime("%H%M%S")
+    # only needs to differ between swaps so the dummy visibly changes
+    stamp = str(time.time_ns() // 1_000_000 % 1_000_000)
     for d in swap_days:
+        key = str(d)
         if pi < len(picked_ids):
-            current[str(d)] = picked_ids[pi]
+            current[key] = picked_ids[pi]
             pi += 1
         else:
             # Dummy muss sichtbar "neu" sein (sonst wirkt's wie nicht getauscht)
             base = dummy_titles[di] if di < len(dummy_titles) else "KI: Neues Rezept"
-            current[str(d)] = f"{base} ({stamp}-{d})"
+            current[key] = f"{base} ({stamp}-{d})"
             di += 1
 
     return current
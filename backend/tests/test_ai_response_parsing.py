@@ -0,0 +1,44 @@
+import unittest
+from types import SimpleNamespace
+
+from app.ai_utils import parse_response_json, parse_response_json_any
+
+
+class ResponseJsonParsingTest(unittest.TestCase):
+    def _response(self, text: str) -> SimpleNamespace:
+        return SimpleNamespace(output_text=text, output=[])
+
+    def test_plain_json_is_parsed_without_fence_handling(self):
+        self.assertEqual(parse_response_json(self._response('{"ok": true}')), {"ok": True})
+
+    def test_fenced_json_with_language_tag_is_unwrapped(self):
+        text = '```json\n{"items": [1, 2]}\n```'
+        self.assertEqual(parse_response_json(self._response(text)), {"items": [1, 2]})
+
+    def test_single_line_fence_is_unwrapped(self):
+        self.assertEqual(parse_response_json_any(self._response('```json[1, 2]```')), [1, 2])
+
+    def test_embedded_json_falls_back_to_brace_extraction(self):
+        text = 'Hier ist das Ergebnis: {"a": 1} danke'
+        self.assertEqual(parse_response_json(self._response(text)), {"a": 1})
+
+    def test_dict_shaped_output_items_are_walked_when_output_text_is_empty(self):
+        response = SimpleNamespace(
+            output_text="",
+            output=[{"content": [{"type": "reasoning"}, {"type": "output_text", "text": '{"b": 2}'}]}],
+        )
+        self.assertEqual(parse_response_json(response), {"b": 2})
+
+    def test_json_chunk_wins_over_text_in_the_same_output(self):
+        response = SimpleNamespace(
+            output_text="nicht json",
+            output=[{"content": [{"type": "output_text", "text": "nicht json"}, {"type": "output_json", "json": [3]}]}],
+        )
+        self.assertEqual(parse_response_json_any(response), [3])
+
+    def test_invalid_json_returns_none(self):
+        self.assertIsNone(parse_response_json(self._response("keine Daten")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import uuid
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.models import RecipePhoto
+
+
+class JSONGZipMiddlewareTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(main.app)
+
+    def test_large_json_responses_are_gzipped(self):
+        response = self.client.get("/api/openapi.json", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("content-encoding"), "gzip")
+        self.assertIn("paths", response.json())
+
+    def test_recipe_photo_is_served_without_gzip(self):
+        rid = uuid.uuid4()
+        data = b"\xff\xd8\xff" + bytes(range(256)) * 20
+        session = mock.MagicMock()
+        session.__enter__.return_value.get.return_value = RecipePhoto(recipe_id=rid, mime="image/jpeg", data=data)
+        with mock.patch.object(main, "engine", object()), mock.patch.object(main, "Session", return_value=session):
+            response = self.client.get(f"/api/recipes/{rid}/photo", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from app import main
+
+
+class SettingsDefaultsTest(unittest.TestCase):
+    def test_activities_defaults_are_fresh_lists(self):
+        first = main._normalize_activities_settings(None)
+        first["home_materials"].append("Schere")
+        second = main._normalize_activities_settings(None)
+        self.assertEqual(second["home_materials"], ["Bücher", "Bausteine", "Kissen", "Klebeband", "Papier"])
+        self.assertIsInstance(main.DEFAULT_ACTIVITIES_SETTINGS["home_materials"], tuple)
+
+    def test_activities_missing_keys_fall_back_to_default_labels(self):
+        self.assertEqual(main._normalize_activities_settings({})["home_types"], ["Bewegung", "Rollenspiel", "Bauen"])
+
+    def test_birthday_defaults_are_fresh_lists(self):
+        first = main._normalize_birthday_settings(None)
+        first["gift_no_goes"].clear()
+        self.assertEqual(main._normalize_birthday_settings(None)["gift_no_goes"], ["zu laut", "zu groß"])
+        self.assertEqual(main._normalize_birthday_settings({})["gift_preferred_types"], ["Erlebnis", "Kreativ", "Spielzeug"])
+
+    def test_pantry_defaults_are_read_only_and_normalized_into_fresh_lists(self):
+        with self.assertRaises(TypeError):
+            main.DEFAULT_PANTRY_ITEMS[0]["aliases"] = ["Meersalz"]
+        first = main._normalize_pantry_items(main.DEFAULT_PANTRY_ITEMS)
+        oil = next(item for item in first if item["name"] == "Olivenöl")
+        oil["aliases"].append("Rapsöl")
+        second = main._normalize_pantry_items(main.DEFAULT_PANTRY_ITEMS)
+        self.assertEqual(next(item for item in second if item["name"] == "Olivenöl")["aliases"], ["Speiseöl", "Kochöl"])
+
+
+if __name__ == "__main__":
+    unittest.main()
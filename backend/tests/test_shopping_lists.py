@@ -1,4 +1,6 @@
 import unittest
+import uuid
+from unittest import mock
 
 from app.shopping_utils import (
     infer_single_item_category,
@@ -7,10 +9,11 @@ from app.shopping_utils import (
     shopping_estimate_lines,
     shopping_snapshot_items,
 )
-from app.services.shop_output import match_pantry_item, suggest_pantry_aliases_from_ingredients
-from app.services.shop_ai import prepare_shop_lines_for_snapshot
-from app.models import ShoppingList, ShoppingListItem
-from app.main import _normalize_pantry_items
+from app.services.shop_output import _load_plan_recipes, match_pantry_item, suggest_pantry_aliases_from_ingredients
+from app.services import shop_ai
+from app.services.shop_ai import prepare_shop_lines_for_snapshot, transform_shop_list
+from app.models import Recipe, ShoppingList, ShoppingListItem
+from app.main import _cached_shop_payload, _clear_shop_payload_cache, _normalize_pantry_items
 
 
 class ShoppingListUtilsTest(unittest.TestCase):
@@ -185,6 +188,50 @@ class ShoppingListUtilsTest(unittest.TestCase):
         prepared = prepare_shop_lines_for_snapshot(["2 Knoblauchzehen", "3 Knoblauchzehen", "Milch"])
         self.assertEqual(prepared, ["5 Knoblauchzehen", "Milch"])
 
+    def test_prepare_shop_lines_reads_number_words_as_whole_words(self):
+        prepared = prepare_shop_lines_for_snapshot(["eine Zwiebel", "500g Mehl", "1.5 kg Mehl", "Einkaufstasche"])
+        self.assertEqual(prepared, ["1 Zwiebel", "2000 g Mehl", "Einkaufstasche"])
+
+    def test_transform_shop_list_skips_ai_for_tiny_lists(self):
+        with mock.patch.dict("os.environ", {"OPENAI_API_KEY": "", "OPENAI_SHOP_MIN_LINES": ""}):
+            lines, warning = transform_shop_list(["2 Knoblauchzehen", "3 Knoblauchzehen", "Milch"])
+        self.assertEqual(lines, ["5 Knoblauchzehen", "Milch"])
+        self.assertIsNone(warning)
+
+    def test_transform_shop_list_reuses_ai_result_for_same_lines(self):
+        lines = ["2 Tomaten", "Milch", "500 g Mehl"]
+        groups = [{"canonical_name": line, "merged_line": line, "source_indexes": [i]} for i, line in enumerate(lines)]
+        response = mock.Mock(output_parsed={"groups": groups})
+        shop_ai._ai_result_cache.clear()
+        shop_ai._openai_clients.clear()
+        self.addCleanup(shop_ai._ai_result_cache.clear)
+        self.addCleanup(shop_ai._openai_clients.clear)
+        with mock.patch.dict("os.environ", {"OPENAI_API_KEY": "test"}), mock.patch("openai.OpenAI") as client_cls:
+            client_cls.return_value.with_options.return_value.responses.create.return_value = response
+            first = transform_shop_list(lines)
+            second = transform_shop_list(list(lines))
+        self.assertEqual(first, second)
+        self.assertIsNone(first[1])
+        self.assertEqual(client_cls.call_count, 1)
+
+    def test_transform_shop_list_falls_back_on_truncated_ai_response(self):
+        lines = ["2 Tomaten", "Milch", "500 g Mehl"]
+        partial = {"groups": [{"canonical_name": "Milch", "merged_line": "Milch", "source_indexes": [1]}]}
+        response = mock.Mock(status="incomplete", output_parsed=partial)
+        shop_ai._ai_result_cache.clear()
+        shop_ai._openai_clients.clear()
+        self.addCleanup(shop_ai._ai_result_cache.clear)
+        self.addCleanup(shop_ai._openai_clients.clear)
+        with mock.patch.dict("os.environ", {"OPENAI_API_KEY": "test"}), mock.patch("openai.OpenAI") as client_cls:
+            create = client_cls.return_value.with_options.return_value.responses.create
+            create.return_value = response
+            result, warning = transform_shop_list(lines)
+            transform_shop_list(list(lines))
+        self.assertEqual(result, prepare_shop_lines_for_snapshot(lines))
+        self.assertEqual(warning, "AI Sortierung nicht verfügbar.")
+        self.assertGreaterEqual(create.call_args.kwargs["max_output_tokens"], 1000)
+        self.assertEqual(create.call_count, 2)
+
     def test_infer_single_item_category_detects_knoblauchzehen_as_gemuese(self):
         self.assertEqual(infer_single_item_category("5 Knoblauchzehen"), "Gemüse & Kräuter")
 
@@ -200,6 +247,76 @@ class ShoppingListUtilsTest(unittest.TestCase):
         self.assertEqual(c.item_order, 1)
         self.assertEqual(b.item_order, 2)
 
+    def test_cached_shop_payload_reuses_result_until_inputs_change(self):
+        _clear_shop_payload_cache()
+        pantry = [{"name": "Salz", "uncertain": False, "aliases": []}]
+        payload = {"mode": "ai_consolidated", "buy": [], "message": "ok", "warning": None}
+        with mock.patch("app.main.build_shop_payload", return_value=payload) as build:
+            _cached_shop_payload("ai_consolidated", {"1": "a"}, pantry)
+            _cached_shop_payload("ai_consolidated", {"1": "a"}, pantry)
+            self.assertEqual(build.call_count, 1)
+            _cached_shop_payload("ai_consolidated", {"1": "b"}, pantry)
+            self.assertEqual(build.call_count, 2)
+            _clear_shop_payload_cache()
+            _cached_shop_payload("ai_consolidated", {"1": "a"}, pantry)
+            self.assertEqual(build.call_count, 3)
+
+    def test_cached_shop_payload_ignores_key_order_and_returns_independent_copies(self):
+        _clear_shop_payload_cache()
+        payload = {"mode": "ai_consolidated", "buy": ["Milch"], "message": "ok", "warning": None}
+        with mock.patch("app.main.build_shop_payload", return_value=payload) as build:
+            first = _cached_shop_payload("ai_consolidated", {"1": "a", "2": "b"}, [])
+            first["buy"].append("Brot")
+            second = _cached_shop_payload("ai_consolidated", {"2": "b", "1": "a"}, [])
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(second["buy"], ["Milch"])
+
+    def test_cached_shop_payload_skips_payloads_with_warning(self):
+        _clear_shop_payload_cache()
+        payload = {"mode": "ai_consolidated", "buy": [], "message": "ok", "warning": "AI Sortierung nicht verfügbar."}
+        with mock.patch("app.main.build_shop_payload", return_value=payload) as build:
+            _cached_shop_payload("ai_consolidated", {"1": "a"}, [])
+            _cached_shop_payload("ai_consolidated", {"1": "a"}, [])
+            self.assertEqual(build.call_count, 2)
+
+    def test_cached_shop_payload_retries_ai_after_failed_call(self):
+        _clear_shop_payload_cache()
+        shop_ai._ai_result_cache.clear()
+        shop_ai._openai_clients.clear()
+        self.addCleanup(_clear_shop_payload_cache)
+        self.addCleanup(shop_ai._ai_result_cache.clear)
+        self.addCleanup(shop_ai._openai_clients.clear)
+        aggregated = {
+            "buy": [],
+            "buy_lines": ["2 Tomaten", "Milch", "500 g Mehl"],
+            "pantry_used": [],
+            "pantry_uncertain_used": [],
+            "pantry_matches": [],
+            "message": "ok",
+        }
+        with mock.patch.dict("os.environ", {"OPENAI_API_KEY": "test"}), mock.patch(
+            "openai.OpenAI"
+        ) as client_cls, mock.patch("app.services.shop_output.aggregate_shop_items", return_value=aggregated):
+            create = client_cls.return_value.with_options.return_value.responses.create
+            create.side_effect = TimeoutError()
+            first = _cached_shop_payload("ai_consolidated", {"1": "a"}, [])
+            second = _cached_shop_payload("ai_consolidated", {"1": "a"}, [])
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(first["warning"], "AI Sortierung nicht verfügbar.")
+        self.assertFalse(first["ai_applied"])
+        self.assertIn("AI Sortierung nicht verfügbar.", second["message"])
+
+    def test_plan_recipes_load_in_day_order_with_repeats(self):
+        pasta = Recipe(id=uuid.uuid4(), title="Pasta", ingredients=["Nudeln"])
+        curry = Recipe(id=uuid.uuid4(), title="Curry", ingredients=["Reis"])
+        days = {"1": str(curry.id), "2": "KI: Neues Rezept 1", "3": str(pasta.id), "5": str(curry.id)}
+        session = mock.MagicMock()
+        session.__enter__.return_value.exec.return_value = [pasta, curry]
+        with mock.patch("app.services.shop_output.Session", return_value=session) as session_cls:
+            recipes = _load_plan_recipes(days, engine=object())
+        self.assertEqual(session_cls.call_count, 1)
+        self.assertEqual([r.title for r in recipes], ["Curry", "Pasta", "Curry"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+from app.services import swap_service
+
+
+POOL = [
+    ("r1", frozenset({"pasta"})),
+    ("r2", frozenset({"vegi"})),
+    ("r3", frozenset({"pasta", "schnell"})),
+    ("r4", frozenset()),
+]
+
+
+class PickRecipesForDaysTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(swap_service, "_active_recipe_pool", return_value=POOL)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_excludes_existing_ids_and_fills_with_dummies(self):
+        picked, dummy = swap_service.pick_recipes_for_days(object(), existing_ids=["r1", "r2"], count=3)
+        self.assertEqual(sorted(picked), ["r3", "r4"])
+        self.assertEqual(dummy, ["KI: Neues Rezept 1"])
+
+    def test_without_preferences_samples_only_the_requested_count(self):
+        picked, dummy = swap_service.pick_recipes_for_days(object(), existing_ids=["r4"], count=2)
+        self.assertEqual(len(picked), 2)
+        self.assertEqual(len(set(picked)), 2)
+        self.assertTrue(set(picked) <= {"r1", "r2", "r3"})
+        self.assertEqual(dummy, [])
+
+    def test_preferred_tags_fill_the_preferred_slots_first(self):
+        picked, dummy = swap_service.pick_recipes_for_days(
+            object(), existing_ids=[], count=3, prefer_tags=["pasta"], prefer_max=2
+        )
+        self.assertEqual(sorted(picked[:2]), ["r1", "r3"])
+        self.assertEqual(len(set(picked)), 3)
+        self.assertEqual(dummy, [])
+
+    def test_does_not_mutate_cached_pool(self):
+        swap_service.pick_recipes_for_days(object(), existing_ids=[], count=4)
+        self.assertEqual([rid for rid, _ in POOL], ["r1", "r2", "r3", "r4"])
+
+
+class UpdateAvoidListTest(unittest.TestCase):
+    def test_adds_real_recipes_on_swap_days(self):
+        avoid = {"r9"}
+        updated = swap_service.update_avoid_list_for_reroll({"1": "r1", "2": "KI: Pasta"}, [1, 2], avoid)
+        self.assertEqual(updated, {"r1", "r9"})
+        self.assertEqual(avoid, {"r9"})
+
+    def test_returns_the_given_set_when_nothing_is_new(self):
+        avoid = {"r1"}
+        days = {"1": "r1", "2": "KI: Pasta", "3": ""}
+        self.assertIs(swap_service.update_avoid_list_for_reroll(days, [1, 2, 3], avoid), avoid)
+
+
+class ApplySwapsTest(unittest.TestCase):
+    def test_no_swap_days_returns_plan_without_touching_the_pool(self):
+        days = {"1": "r1", "2": "KI: Pasta"}
+        with mock.patch.object(swap_service, "_active_recipe_pool") as pool:
+            self.assertEqual(swap_service.apply_swaps(object(), days, [], set()), days)
+            self.assertEqual(swap_service.pick_recipes_for_days(object(), existing_ids=[], count=0), ([], []))
+        pool.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+class TelegramWebhookDispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(main.app)
+        self.swap = mock.Mock(return_value="swap")
+        self.note = mock.Mock(return_value="note")
+        self.add = mock.Mock(return_value="add")
+        self.send_menu = mock.AsyncMock()
+        patches = [
+            mock.patch.object(main, "engine", object()),
+            mock.patch.object(main, "_remember_telegram_chat"),
+            mock.patch.object(main, "_is_allowed", return_value=True),
+            mock.patch.object(main, "_tg_handle_flow_message", mock.AsyncMock(return_value=False)),
+            mock.patch.object(main, "_tg_send_menu", self.send_menu),
+            mock.patch.object(main, "_spawn_tg"),
+            mock.patch.dict(main._TG_PREFIX_COMMANDS, {"swap": self.swap}),
+            mock.patch.dict(main._TG_VERB_COMMANDS, {"add": self.add, "notiz": self.note}),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _send(self, text):
+        update = {"message": {"text": text, "chat": {"id": 1}, "from": {"id": 2}}}
+        response = self.client.post("/bot/telegram/webhook", json=update)
+        self.assertEqual(response.status_code, 200)
+
+    def test_newline_separated_arguments_reach_their_handler(self):
+        self._send("swap\n2 5")
+        self._send("notiz\nSchulausflug Freitag")
+        self._send("add\tMilch")
+        self.swap.assert_called_once()
+        self.assertEqual(self.swap.call_args.args[0], "swap\n2 5")
+        self.assertEqual(self.note.call_args.args[0], "notiz\nSchulausflug Freitag")
+        self.assertEqual(self.add.call_args.args[0], "add\tMilch")
+        self.send_menu.assert_not_awaited()
+
+    def test_bare_and_glued_swap_reach_the_swap_handler(self):
+        self._send("swap")
+        self._send("swap2")
+        self.assertEqual([call.args[0] for call in self.swap.call_args_list], ["swap", "swap2"])
+        self.send_menu.assert_not_awaited()
+
+    def test_unknown_text_gets_help(self):
+        self._send("hallo")
+        self.send_menu.assert_awaited_once()
+        self.swap.assert_not_called()
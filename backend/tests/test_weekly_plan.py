@@ -0,0 +1,48 @@
+import unittest
+import uuid
+from unittest import mock
+
+from app import main
+from app.models import Recipe
+
+
+class DayRecipeCacheTest(unittest.TestCase):
+    def setUp(self):
+        main._day_recipe_cache.clear()
+        self.addCleanup(main._day_recipe_cache.clear)
+
+    def _patched_session(self, rows):
+        session = mock.MagicMock()
+        session.__enter__.return_value.exec.return_value.all.return_value = rows
+        return mock.patch.object(main, "Session", return_value=session)
+
+    def test_second_lookup_is_served_from_cache(self):
+        rid = uuid.uuid4()
+        recipe = Recipe(id=rid, title="Lasagne")
+        days = {"1": str(rid), "2": "KI: Neues Rezept 1"}
+
+        with self._patched_session([recipe]) as session_cls:
+            first = main._load_day_recipes(days)
+            second = main._load_day_recipes(days)
+
+        self.assertEqual(session_cls.call_count, 1)
+        self.assertEqual(first[str(rid)].title, "Lasagne")
+        self.assertIs(second[str(rid)], recipe)
+
+    def test_invalidate_forces_reload(self):
+        rid = uuid.uuid4()
+        days = {"1": str(rid)}
+        with self._patched_session([Recipe(id=rid, title="Alt")]):
+            main._load_day_recipes(days)
+        main._invalidate_day_recipe(rid)
+        with self._patched_session([Recipe(id=rid, title="Neu")]):
+            self.assertEqual(main._load_day_recipes(days)[str(rid)].title, "Neu")
+
+    def test_dummy_and_invalid_ids_skip_the_database(self):
+        with self._patched_session([]) as session_cls:
+            self.assertEqual(main._load_day_recipes({"1": "KI: Pasta", "2": "kaputt", "3": ""}), {})
+        session_cls.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,7 @@
+-- Speeds up the duplicate check in POST /api/recipes and /api/recipes/import/preview
+-- (select id from recipes where source_url = ...). Partial: manual recipes have no URL.
+-- Not UNIQUE on purpose: Telegram `add ... | https://...` never deduplicated, so
+-- existing rows may share a URL and a unique index would fail to build.
+CREATE INDEX IF NOT EXISTS recipes_source_url_idx
+  ON public.recipes USING btree (source_url)
+  WHERE source_url IS NOT NULL;
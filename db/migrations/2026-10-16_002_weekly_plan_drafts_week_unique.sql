@@ -0,0 +1,11 @@
+-- One draft per week: lets _db_create_draft upsert with ON CONFLICT (week_start_date)
+-- instead of DELETE + INSERT. The app always deleted before inserting, so duplicates
+-- should not exist; keep only the newest row per week just in case.
+DELETE FROM public.weekly_plan_drafts d
+USING public.weekly_plan_drafts newer
+WHERE d.week_start_date = newer.week_start_date
+  AND (d.created_at, d.id) < (newer.created_at, newer.id);
+
+DROP INDEX IF EXISTS public.weekly_plan_drafts_week_idx;
+CREATE UNIQUE INDEX IF NOT EXISTS weekly_plan_drafts_week_start_date_key
+  ON public.weekly_plan_drafts USING btree (week_start_date);
@@ -0,0 +1,7 @@
+-- GET /api/recipes?q=... filters with title ILIKE '%q%'. A leading wildcard cannot use
+-- a btree, so every search scanned all of recipes. pg_trgm's GIN opclass serves
+-- ILIKE directly; it is built on the plain column because that is what the query uses.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS recipes_title_trgm_idx
+  ON public.recipes USING gin (title gin_trgm_ops);
@@ -0,0 +1,5 @@
+-- Default recipe listing (GET /api/recipes without q, _db_list_recipes):
+-- WHERE is_active ORDER BY created_at DESC LIMIT n reads the newest rows off this index.
+CREATE INDEX IF NOT EXISTS recipes_active_created_at_idx
+  ON public.recipes USING btree (created_at DESC)
+  WHERE is_active;